@@ -0,0 +1,306 @@
+#Headless batch pipeline for HP Exporter Plugins
+#
+#Usage:
+#   blender -b --python hpr_batch.py -- manifest.json [--workers N] [--blender PATH]
+#
+#The manifest lists the vehicles to prepare, paths are relative to the manifest:
+#   {
+#       "output_directory": "out",
+#       "vehicles": [
+#           {"car_id": "64", "model": "models/64.fbx", "rules": "rules.json"}
+#       ]
+#   }
+#
+#An optional "asset_library" next to "output_directory" links the default textures from a library
+#built with build_asset_library() instead of loading them into every vehicle file.
+#
+#Each vehicle is prepared in its own Blender process (clear scene, collections, default textures,
+#parenting, material templates, vertex cache order) and saved as <output_directory>/VEH_<car_id>_MS.blend.
+#
+#Results are cached by a hash of the model, rules, texture manifest and the add-on itself, so
+#vehicles that haven't changed since the last run are copied from the cache instead.
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+script_directory = os.path.dirname(os.path.abspath(__file__))
+
+def script_arguments():
+
+    #Blender keeps its own arguments before "--"
+    if "--" in sys.argv:
+        return sys.argv[sys.argv.index("--") + 1:]
+    return sys.argv[1:]
+
+def read_manifest(manifest_path):
+
+    base_directory = os.path.dirname(os.path.abspath(manifest_path))
+
+    with open(manifest_path, encoding = 'utf-8') as file:
+        manifest = json.load(file)
+
+    output_directory = os.path.join(base_directory, manifest.get("output_directory", "."))
+    asset_library = manifest.get("asset_library", "")
+    vehicles = []
+
+    for vehicle in manifest["vehicles"]:
+        car_id = str(vehicle["car_id"])
+        rules = vehicle.get("rules", manifest.get("rules", ""))
+
+        vehicles.append({
+            "car_id": car_id,
+            "model": os.path.join(base_directory, vehicle["model"]),
+            "rules": os.path.join(base_directory, rules) if rules else "",
+            "asset_library": os.path.join(base_directory, asset_library) if asset_library else "",
+            "output": os.path.join(output_directory, vehicle.get("output", "VEH_" + car_id + "_MS.blend")),
+        })
+
+    return vehicles
+
+def run_worker(blender, vehicle):
+
+    start = time.perf_counter()
+    command = [blender, "-b", "--factory-startup", "--python-exit-code", "1", "--python", os.path.abspath(__file__),
+               "--", "--worker", json.dumps(vehicle)]
+    result = subprocess.run(command, stdout = subprocess.PIPE, stderr = subprocess.STDOUT, text = True)
+
+    return vehicle, result.returncode, result.stdout, time.perf_counter() - start
+
+def hash_file(hasher, filepath):
+
+    with open(filepath, 'rb') as file:
+        while True:
+            chunk = file.read(1 << 20)
+            if not chunk:
+                break
+            hasher.update(chunk)
+
+def cache_key(vehicle):
+
+    #Source files stand in for the template table and the pipeline stages, changing any of them,
+    #the model, the rules or the texture manifest invalidates the cache
+    hasher = hashlib.sha256()
+    hasher.update(vehicle["car_id"].encode())
+
+    #Only the path matters for a linked library, its content isn't saved in the vehicle file
+    hasher.update(b"\0" + vehicle.get("asset_library", "").encode())
+
+    inputs = (
+        vehicle["model"],
+        vehicle["rules"],
+        os.path.join(script_directory, "hpr_exporter_plugins.py"),
+        os.path.abspath(__file__),
+        os.path.join(script_directory, "hpr_lod.py"),
+        os.path.join(script_directory, "HP_DefaultTextures", "manifest.json"),
+    )
+
+    for filepath in inputs:
+        hasher.update(b"\0")
+        if filepath and os.path.isfile(filepath):
+            hash_file(hasher, filepath)
+
+    return hasher.hexdigest()
+
+def evict_cache(cache_directory, cache_size):
+
+    #Least recently used first, hits refresh the modified time
+    entries = []
+    for name in os.listdir(cache_directory):
+        if name.endswith(".blend"):
+            stat = os.stat(os.path.join(cache_directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for modified, size, name in entries)
+
+    for modified, size, name in sorted(entries):
+        if total <= cache_size:
+            break
+        os.remove(os.path.join(cache_directory, name))
+        total -= size
+        print("Evicted " + name + " from cache.")
+
+def restore_cached(vehicle, cache_directory):
+
+    cached = os.path.join(cache_directory, vehicle["key"] + ".blend")
+
+    if not os.path.isfile(cached):
+        return False
+
+    os.makedirs(os.path.dirname(vehicle["output"]), exist_ok = True)
+    shutil.copyfile(cached, vehicle["output"])
+    os.utime(cached)
+
+    return True
+
+def store_cached(vehicle, cache_directory):
+
+    cached = os.path.join(cache_directory, vehicle["key"] + ".blend")
+    temporary = cached + ".tmp"
+
+    shutil.copyfile(vehicle["output"], temporary)
+    os.replace(temporary, cached)
+
+def run_pipeline(vehicles, blender, workers, cache_directory = "", cache_size = 0):
+
+    failed = 0
+    pending = []
+
+    for vehicle in vehicles:
+        if cache_directory:
+            vehicle["key"] = cache_key(vehicle)
+
+            if restore_cached(vehicle, cache_directory):
+                print(f"[CACHED] VEH_{vehicle['car_id']}_MS -> {vehicle['output']}")
+                continue
+
+        pending.append(vehicle)
+
+    with ThreadPoolExecutor(max_workers = workers) as executor:
+        for vehicle, returncode, output, duration in executor.map(lambda vehicle: run_worker(blender, vehicle), pending):
+            if returncode == 0:
+                print(f"[OK] VEH_{vehicle['car_id']}_MS ({duration:.1f} s) -> {vehicle['output']}")
+                if cache_directory:
+                    store_cached(vehicle, cache_directory)
+            else:
+                failed += 1
+                print(f"[FAILED] VEH_{vehicle['car_id']}_MS ({duration:.1f} s)")
+                print(output)
+
+    if cache_directory:
+        evict_cache(cache_directory, cache_size)
+
+    print(f"Prepared {len(vehicles) - failed} of {len(vehicles)} vehicles ({len(vehicles) - len(pending)} from cache).")
+
+    return 0 if failed == 0 else -1
+
+#Everything below only runs inside a Blender worker process
+
+def find_layer_collection(layer_collection, name):
+
+    if layer_collection.name == name:
+        return layer_collection
+
+    for child in layer_collection.children:
+        found = find_layer_collection(child, name)
+        if found:
+            return found
+
+    return None
+
+def import_model(bpy, filepath):
+
+    extension = os.path.splitext(filepath)[1].lower()
+
+    if extension == ".fbx":
+        bpy.ops.import_scene.fbx(filepath = filepath)
+    elif extension == ".obj":
+        bpy.ops.wm.obj_import(filepath = filepath)
+    elif extension in (".gltf", ".glb"):
+        bpy.ops.import_scene.gltf(filepath = filepath)
+    elif extension == ".dae":
+        bpy.ops.wm.collada_import(filepath = filepath)
+    elif extension == ".blend":
+        with bpy.data.libraries.load(filepath, link = False) as (data_from, data_to):
+            data_to.objects = data_from.objects
+
+        collection = bpy.context.view_layer.active_layer_collection.collection
+        for obj in data_to.objects:
+            if obj is not None:
+                collection.objects.link(obj)
+    else:
+        print("Unsupported model format " + extension)
+        return -1
+
+    return 0
+
+def prepare_vehicle(vehicle):
+
+    import bpy
+    sys.path.insert(0, script_directory)
+    import hpr_exporter_plugins as hpr
+
+    hpr.compile_material_templates()
+    hpr.load_texture_manifest()
+
+    status = 0
+    car_id = vehicle["car_id"]
+
+    #Prepare Collection
+    status += hpr.clear_scene()
+    status += hpr.setup_vehicle_id(car_id)
+    if vehicle.get("asset_library"):
+        status += hpr.link_asset_library(vehicle["asset_library"])
+    else:
+        status += hpr.import_default_hp_textures(lazy = True)
+
+    if status != 0:
+        return -1
+
+    view_layer = bpy.context.view_layer
+    view_layer.active_layer_collection = find_layer_collection(view_layer.layer_collection, car_id + "_Graphics")
+
+    if import_model(bpy, vehicle["model"]) != 0:
+        return -1
+
+    #Assign parent, meshes the model already parents are left as they are
+    unparented = 0
+    for obj in view_layer.objects:
+        obj.select_set(obj.type == 'MESH' and obj.parent is None)
+        unparented += obj.select_get()
+
+    if unparented:
+        status += hpr.apply_mesh_rotation(batch = True)
+
+    #Material templates for every mesh of the vehicle
+    for obj in view_layer.objects:
+        obj.select_set(obj.type == 'MESH')
+
+    processed, skipped, failed = hpr.auto_assign_material_templates(vehicle["rules"], dry_run = False)
+    print(f"Assigned templates to {processed} materials ({skipped} skipped, {failed} failed).")
+
+    #Triangle and vertex order for the GPU vertex cache, once transforms are final
+    status += hpr.optimize_vertex_cache(hpr.only_selected_mesh())
+
+    os.makedirs(os.path.dirname(vehicle["output"]), exist_ok = True)
+    bpy.ops.wm.save_as_mainfile(filepath = vehicle["output"])
+
+    return status
+
+def main():
+
+    parser = argparse.ArgumentParser(description = "Prepare HPR vehicles for exporting without the UI.")
+    parser.add_argument("manifest", nargs = "?", help = "JSON file listing the vehicles to prepare")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1, help = "Number of Blender processes to run at once")
+    parser.add_argument("--blender", default = "", help = "Blender executable for the workers, defaults to the one running this script")
+    parser.add_argument("--cache", default = "", help = "Directory for cached results, defaults to .hpr_cache next to the manifest")
+    parser.add_argument("--cache-size", type = int, default = 4096, help = "Maximum size of the cache in MB, 0 disables caching")
+    parser.add_argument("--worker", default = "", help = argparse.SUPPRESS)
+    args = parser.parse_args(script_arguments())
+
+    if args.worker:
+        return prepare_vehicle(json.loads(args.worker))
+
+    if not args.manifest:
+        parser.error("a manifest is required")
+
+    blender = args.blender
+    if not blender:
+        import bpy
+        blender = bpy.app.binary_path
+
+    cache_directory = ""
+    if args.cache_size > 0:
+        cache_directory = args.cache or os.path.join(os.path.dirname(os.path.abspath(args.manifest)), ".hpr_cache")
+        os.makedirs(cache_directory, exist_ok = True)
+
+    return run_pipeline(read_manifest(args.manifest), blender, max(1, args.workers), cache_directory, args.cache_size * 1024 * 1024)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() == 0 else 1)
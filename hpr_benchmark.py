@@ -0,0 +1,227 @@
+#Benchmarks for HP Exporter Plugins
+#
+#Usage:
+#   blender -b --factory-startup --python hpr_benchmark.py -- [--output results.json]
+#       [--baseline previous.json] [--threshold 1.25] [--meshes 10,100,500,2000]
+#
+#Synthetic scenes are generated for every mesh count, then clear_scene(), import_default_hp_textures(),
+#apply_mesh_rotation() and the material templates are timed on them. Results are written as JSON so runs
+#from different commits can be compared, and the script exits with 1 when a path got slower than the
+#baseline by more than the threshold.
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import bpy
+
+script_directory = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_directory)
+
+import hpr_exporter_plugins as hpr
+
+def script_arguments():
+
+    #Blender keeps its own arguments before "--"
+    if "--" in sys.argv:
+        return sys.argv[sys.argv.index("--") + 1:]
+    return sys.argv[1:]
+
+def git_revision():
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd = script_directory, stdout = subprocess.PIPE,
+                              stderr = subprocess.DEVNULL, text = True).stdout.strip()
+    except OSError:
+        return ""
+
+def grid_mesh(name, vertex_count):
+
+    #Square grid of quads with roughly vertex_count vertices
+    side = max(2, int(math.sqrt(vertex_count)))
+    vertices = [(x * 0.01, y * 0.01, 0.0) for y in range(side) for x in range(side)]
+    faces = [(y * side + x, y * side + x + 1, (y + 1) * side + x + 1, (y + 1) * side + x)
+             for y in range(side - 1) for x in range(side - 1)]
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(vertices, [], faces)
+
+    return mesh
+
+def build_scene(mesh_count, vertex_count, material_count, texture_count):
+
+    hpr.clear_scene()
+
+    collection = bpy.context.scene.collection
+    template_mesh = grid_mesh("BenchGrid", vertex_count)
+    materials = []
+
+    for index in range(material_count):
+        mat = bpy.data.materials.new("BenchMaterial_" + str(index))
+        mat.use_nodes = True
+
+        #Give every material a few user images so clearing has something to follow
+        for texture in range(texture_count):
+            image = bpy.data.images.new("BenchImage_" + str(index) + "_" + str(texture), 16, 16)
+            node = mat.node_tree.nodes.new('ShaderNodeTexImage')
+            node.image = image
+
+        materials.append(mat)
+
+    for index in range(mesh_count):
+        mesh = template_mesh.copy()
+        if materials:
+            mesh.materials.append(materials[index % len(materials)])
+
+        obj = bpy.data.objects.new("BenchMesh_" + str(index), mesh)
+        obj.location = (index * 0.1, 0.0, 0.0)
+        obj.rotation_euler = (0.1, 0.2, 0.3)
+        collection.objects.link(obj)
+
+    bpy.data.meshes.remove(template_mesh)
+    bpy.context.view_layer.update()
+
+def select_meshes():
+
+    view_layer = bpy.context.view_layer
+    for obj in view_layer.objects:
+        obj.select_set(obj.type == 'MESH')
+
+def timed(function, *args, **kwargs):
+
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+def bench_clear_scene(params):
+
+    build_scene(params["meshes"], params["vertices"], params["materials"], params["textures"])
+    return timed(hpr.clear_scene)
+
+def bench_import_textures(params, lazy):
+
+    hpr.clear_scene()
+    return timed(hpr.import_default_hp_textures, lazy = lazy)
+
+def bench_apply_mesh_rotation(params, batch):
+
+    build_scene(params["meshes"], params["vertices"], 0, 0)
+    select_meshes()
+    return timed(hpr.apply_mesh_rotation, batch = batch)
+
+def bench_material_templates(params, update):
+
+    build_scene(params["meshes"], 4, params["materials"], 0)
+    hpr.import_default_hp_textures(lazy = True)
+    templates = list(hpr.material_templates.values())
+    materials = list(bpy.data.materials)
+
+    def apply_all():
+        prototypes = {}
+        for index, mat in enumerate(materials):
+            hpr.apply_material_template(mat, templates[index % len(templates)], update, prototypes)
+
+    #The update run measures re-applying templates that are already up to date
+    if update:
+        apply_all()
+
+    return timed(apply_all)
+
+def benchmarks(mesh_count, vertex_count, material_count, texture_count):
+
+    #Without a material count, every four meshes share one
+    params = {"meshes": mesh_count, "vertices": vertex_count, "materials": material_count or max(1, mesh_count // 4), "textures": texture_count}
+
+    yield "clear_scene", params, lambda: bench_clear_scene(params)
+    yield "apply_mesh_rotation_batch", params, lambda: bench_apply_mesh_rotation(params, True)
+
+    #The operator path is quadratic, keep it to sizes that finish
+    if mesh_count <= 200:
+        yield "apply_mesh_rotation_operators", params, lambda: bench_apply_mesh_rotation(params, False)
+
+    yield "material_templates", params, lambda: bench_material_templates(params, False)
+    yield "material_templates_update", params, lambda: bench_material_templates(params, True)
+
+def run_benchmarks(mesh_counts, vertex_count, material_count, texture_count, repeat):
+
+    results = []
+    texture_params = {"textures": len(hpr.texture_manifest)}
+
+    for name, lazy in (("import_default_hp_textures", False), ("import_default_hp_textures_lazy", True)):
+        seconds = min(bench_import_textures(texture_params, lazy) for run in range(repeat))
+        results.append({"name": name, "params": texture_params, "seconds": seconds})
+        print(f"{name:<36}{json.dumps(texture_params):<80}{seconds * 1000:>10.2f} ms")
+
+    for mesh_count in mesh_counts:
+        for name, params, bench in benchmarks(mesh_count, vertex_count, material_count, texture_count):
+            seconds = min(bench() for run in range(repeat))
+            results.append({"name": name, "params": params, "seconds": seconds})
+            print(f"{name:<36}{json.dumps(params):<80}{seconds * 1000:>10.2f} ms")
+
+    hpr.clear_scene()
+
+    return results
+
+def compare(results, baseline_path, threshold):
+
+    with open(baseline_path, encoding = 'utf-8') as file:
+        baseline = {(entry["name"], json.dumps(entry["params"], sort_keys = True)): entry["seconds"]
+                    for entry in json.load(file)["results"]}
+
+    regressions = 0
+
+    for entry in results:
+        previous = baseline.get((entry["name"], json.dumps(entry["params"], sort_keys = True)))
+
+        #Ignore noise on paths that take next to no time
+        if previous is None or max(previous, entry["seconds"]) < 0.005:
+            continue
+
+        ratio = entry["seconds"] / previous
+        if ratio > threshold:
+            regressions += 1
+            print(f"REGRESSION {entry['name']} {json.dumps(entry['params'])}: {previous * 1000:.2f} ms -> {entry['seconds'] * 1000:.2f} ms ({ratio:.2f}x)")
+
+    return regressions
+
+def main():
+
+    parser = argparse.ArgumentParser(description = "Benchmark the HP Exporter Plugins scene preparation paths.")
+    parser.add_argument("--output", default = "", help = "Write results to this JSON file")
+    parser.add_argument("--baseline", default = "", help = "Compare against results from an earlier run")
+    parser.add_argument("--threshold", type = float, default = 1.25, help = "Slowdown ratio that counts as a regression")
+    parser.add_argument("--meshes", default = "10,100,500,2000", help = "Comma separated mesh counts to generate")
+    parser.add_argument("--vertices", type = int, default = 400, help = "Vertices per generated mesh")
+    parser.add_argument("--materials", type = int, default = 0, help = "Materials shared by the generated meshes, 0 for one per four meshes")
+    parser.add_argument("--textures", type = int, default = 2, help = "Image textures per generated material")
+    parser.add_argument("--repeat", type = int, default = 3, help = "Runs per benchmark, the fastest one is kept")
+    args = parser.parse_args(script_arguments())
+
+    hpr.compile_material_templates()
+    hpr.load_texture_manifest()
+
+    results = run_benchmarks([int(count) for count in args.meshes.split(",")], max(4, args.vertices), max(0, args.materials),
+                             max(0, args.textures), max(1, args.repeat))
+
+    if args.output:
+        with open(args.output, 'w', encoding = 'utf-8') as file:
+            json.dump({
+                "commit": git_revision(),
+                "blender": bpy.app.version_string,
+                "platform": platform.platform(),
+                "arguments": vars(args),
+                "results": results,
+            }, file, indent = 4)
+
+    if args.baseline and compare(results, args.baseline, args.threshold) > 0:
+        return -1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() == 0 else 1)
@@ -10,72 +10,570 @@ bl_info = {
 }
 
 import bpy
+import bmesh
+import cProfile
+import hashlib
+import json
 import math
+import mmap
+import numpy
 import os
+import pstats
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from bpy.app.handlers import persistent
 from bpy.types import Operator
-from bpy.props import BoolProperty, StringProperty, EnumProperty
+from mathutils import Matrix, Vector
+from bpy.props import BoolProperty, StringProperty, EnumProperty, FloatProperty, IntProperty
+
+#Trace of the operator currently running, see OperatorTrace
+active_trace = None
+
+def trace_count(name, amount = 1):
+
+    if active_trace:
+        active_trace.counts[name] = active_trace.counts.get(name, 0) + amount
+
+def addon_preferences():
+
+    addon = bpy.context.preferences.addons.get(__name__)
+    return addon.preferences if addon else None
+
+class OperatorTrace:
+
+    #Records wall time per stage and counters of an operator run, optionally under cProfile
+    def __init__(self, operator_name):
+        self.operator_name = operator_name
+        self.stages = []
+        self.counts = {}
+        self.profile = None
+
+    def __enter__(self):
+        global active_trace
+        active_trace = self
+
+        preferences = addon_preferences()
+        if preferences and preferences.profile_operators:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global active_trace
+        active_trace = None
+        total = time.perf_counter() - self.start
+
+        if self.profile:
+            self.profile.disable()
+
+        print(f"{self.operator_name} took {total * 1000:.1f} ms")
+        for name, seconds in self.stages:
+            print(f"    {name:<32}{seconds * 1000:>10.1f} ms")
+        for name, amount in self.counts.items():
+            print(f"    {name:<32}{amount:>10}")
+
+        preferences = addon_preferences()
+        if preferences and (preferences.write_traces or self.profile):
+            self.write(preferences.trace_directory or bpy.app.tempdir, total)
+
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def write(self, directory, total):
+        trace = {
+            "operator": self.operator_name,
+            "blend_file": bpy.data.filepath,
+            "total_seconds": total,
+            "stages": [{"name": name, "seconds": seconds} for name, seconds in self.stages],
+            "counts": self.counts,
+        }
 
-def clear_scene():
+        #Top functions by cumulative time, which is what hot spots show up as
+        if self.profile:
+            stats = pstats.Stats(self.profile).stats
+            entries = sorted(stats.items(), key = lambda item: item[1][3], reverse = True)[:50]
+            trace["profile"] = [{
+                "function": f"{filename}:{line}({function})",
+                "calls": calls,
+                "total_seconds": total_time,
+                "cumulative_seconds": cumulative_time,
+            } for (filename, line, function), (primitive_calls, calls, total_time, cumulative_time, callers) in entries]
 
-    for block in bpy.data.objects:
-        #if block.users == 0:
-            bpy.data.objects.remove(block, do_unlink=True)
+        filepath = os.path.join(bpy.path.abspath(directory), time.strftime("%Y%m%d-%H%M%S") + "_" + self.operator_name + ".json")
 
-    for block in bpy.data.meshes:
-        if block.users == 0:
-            bpy.data.meshes.remove(block)
+        try:
+            with open(filepath, 'w', encoding = 'utf-8') as file:
+                json.dump(trace, file, indent = 4)
+            print("Trace written to " + filepath)
+        except OSError as error:
+            print("Could not write trace: " + str(error))
 
-    for block in bpy.data.materials:
-        if block.users == 0:
-            bpy.data.materials.remove(block)
+#Data removed by clear_scene once nothing uses it anymore
+clear_scene_orphan_types = ('meshes', 'materials', 'textures', 'images', 'cameras', 'lights', 'armatures')
 
-    for block in bpy.data.textures:
-        if block.users == 0:
-            bpy.data.textures.remove(block)
+def estimate_datablock_size(block):
 
-    for block in bpy.data.images:
-        if block.users == 0:
-            bpy.data.images.remove(block)
+    #Only meshes and loaded images hold enough data to matter
+    if isinstance(block, bpy.types.Mesh):
+        return (len(block.vertices) * 3 + len(block.edges) * 2 + len(block.loops) * 2 + len(block.polygons) * 3) * 4
 
-    for block in bpy.data.cameras:
-        if block.users == 0:
-            bpy.data.cameras.remove(block)
+    if isinstance(block, bpy.types.Image) and block.has_data:
+        return block.size[0] * block.size[1] * block.channels * (4 if block.is_float else 1)
 
-    for block in bpy.data.lights:
-        if block.users == 0:
-            bpy.data.lights.remove(block)
+    return 0
 
-    for block in bpy.data.armatures:
-        if block.users == 0:
-            bpy.data.armatures.remove(block)
+def remove_datablocks(removed, find_orphans):
 
-    for block in bpy.data.collections:
-        if block.users == 0:
-            bpy.data.collections.remove(block)
-        else:
-            bpy.data.collections.remove(block, do_unlink=True)
+    removed_count = 0
+    freed_bytes = 0
+
+    #Removing a block can orphan what it used (object -> mesh -> material -> image), so repeat until nothing is left
+    while removed:
+        removed_count += len(removed)
+        freed_bytes += sum(estimate_datablock_size(block) for block in removed)
+        bpy.data.batch_remove(removed)
+
+        removed = find_orphans()
+
+    trace_count("datablocks_removed", removed_count)
+    trace_count("bytes_freed_estimate", freed_bytes)
+    print(f"Cleared {removed_count} datablocks, freeing about {freed_bytes / (1024 * 1024):.1f} MB.")
+
+def clear_scene():
+
+    #Objects and collections go regardless of users, the rest once orphaned
+    removed = set(bpy.data.objects) | set(bpy.data.collections)
+
+    def find_orphans():
+        return {block for data_type in clear_scene_orphan_types for block in getattr(bpy.data, data_type) if block.users == 0}
+
+    remove_datablocks(removed, find_orphans)
             
     return 0
+
+def is_default_texture(image):
+
+    return image.name in texture_manifest or image.name in default_texture_paths
+
+def clear_vehicle(car_id):
+
+    vehicle_collection = bpy.data.collections.get("VEH_" + car_id + "_MS")
+
+    if vehicle_collection is None:
+        return 0
+
+    collections = {vehicle_collection} | set(vehicle_collection.children_recursive)
+
+    #Objects also linked to a collection outside of this vehicle are kept
+    objects = {obj for obj in vehicle_collection.all_objects if set(obj.users_collection) <= collections}
+
+    #Parent empties go along once all of their children do
+    for obj in list(objects):
+        parent = obj.parent
+        if parent and parent.type == 'EMPTY' and set(parent.children) <= objects:
+            objects.add(parent)
+
+    #Only data used by this vehicle may go, default textures stay for the other vehicles
+    candidates = set()
+
+    for obj in objects:
+        if obj.data:
+            candidates.add(obj.data)
+
+        for slot in obj.material_slots:
+            if slot.material:
+                candidates.add(slot.material)
+
+    for material in [block for block in candidates if isinstance(block, bpy.types.Material)]:
+        if material.node_tree:
+            for node in material.node_tree.nodes:
+                if node.type == 'TEX_IMAGE' and node.image and not is_default_texture(node.image):
+                    candidates.add(node.image)
+
+    def find_orphans():
+        orphans = {block for block in candidates if block.users == 0}
+        candidates.difference_update(orphans)
+        return orphans
+
+    remove_datablocks(objects | collections, find_orphans)
+
+    return 0
     
-def import_default_hp_textures():
+#Default texture file name -> path, filled without touching any image data
+default_texture_paths = {}
+
+#Default texture file name -> manifest entry, read once from HP_DefaultTextures/manifest.json
+texture_manifest = {}
+
+#Default textures referenced by the material templates, filled by compile_material_templates()
+template_default_textures = set()
+
+def default_texture_directory():
+
+    return os.path.join(os.path.dirname(__file__), "HP_DefaultTextures")
+
+#DXGI format from the DX10 extension header -> (format as named for legacy headers, bits per pixel)
+dxgi_formats = {
+    **dict.fromkeys((1, 2, 3, 4), ("RGBA128", 128)),
+    **dict.fromkeys((6, 7, 8), ("RGB96", 96)),
+    **dict.fromkeys((10, 11, 12, 13, 14), ("RGBA64", 64)),
+    **dict.fromkeys((15, 16, 17, 18), ("RGB64", 64)),
+    **dict.fromkeys((23, 24, 25, 27, 28, 29, 30, 31, 32, 87, 90, 91), ("RGBA32", 32)),
+    **dict.fromkeys((26, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 88, 92, 93), ("RGB32", 32)),
+    **dict.fromkeys((48, 49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59, 85), ("RGB16", 16)),
+    86: ("RGBA16", 16),
+    115: ("RGBA16", 16),
+    **dict.fromkeys((60, 61, 62, 63, 64, 65), ("RGB8", 8)),
+    **dict.fromkeys((70, 71, 72), ("BC1", 4)),
+    **dict.fromkeys((73, 74, 75), ("BC2", 8)),
+    **dict.fromkeys((76, 77, 78), ("BC3", 8)),
+    **dict.fromkeys((79, 80), ("BC4U", 4)),
+    81: ("BC4S", 4),
+    **dict.fromkeys((82, 83), ("BC5U", 8)),
+    84: ("BC5S", 8),
+    **dict.fromkeys((94, 95, 96), ("BC6H", 8)),
+    **dict.fromkeys((97, 98, 99), ("BC7", 8)),
+}
+
+def parse_dds_header(header, file_size):
+
+    if len(header) < 128 or header[:4] != b'DDS ':
+        return None
 
-    script_directory = os.path.dirname(__file__)
-    directory = os.path.join(script_directory, "HP_DefaultTextures")
+    flags, height, width = struct.unpack_from('<3I', header, 8)
+    mip_count = struct.unpack_from('<I', header, 28)[0]
+    format_flags, four_cc, bit_count = struct.unpack_from('<I4sI', header, 80)
+    header_size = 128
 
-    if os.path.exists(directory) and os.path.isdir(directory):
+    if format_flags & 0x4:
+        dds_format = four_cc.decode('ascii', 'replace').rstrip('\0')
+    elif format_flags & 0x1:
+        dds_format = "RGBA" + str(bit_count)
+    else:
+        dds_format = "RGB" + str(bit_count)
+
+    #DX10 files name their real format in a 20 byte header after the legacy one
+    if dds_format == "DX10":
+        if len(header) < 148:
+            return None
+        header_size = 148
+        dxgi_format = struct.unpack_from('<I', header, 128)[0]
+        dds_format, bit_count = dxgi_formats.get(dxgi_format, ("DXGI" + str(dxgi_format), 0))
+
+    data_size = file_size - header_size
+
+    #Ripped textures carry a mip chain without flagging it, so count the levels the data holds
+    if not flags & 0x20000 or mip_count == 0:
+        mip_count = 0
+        total = 0
+        level_width, level_height = width, height
+
+        while True:
+            total += dds_level_size(dds_format, bit_count, level_width, level_height)
+            if total > data_size and mip_count > 0:
+                break
+            mip_count += 1
+            if level_width == 1 and level_height == 1:
+                break
+            level_width, level_height = max(1, level_width // 2), max(1, level_height // 2)
+
+    return {
+        "format": dds_format,
+        "width": width,
+        "height": height,
+        "mip_count": mip_count,
+        "bit_count": bit_count,
+    }
+
+def dds_level_size(dds_format, bit_count, width, height):
+
+    if dds_format in ('DXT1', 'BC1', 'ATI1', 'BC4U', 'BC4S'):
+        return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * 8
+
+    if dds_format.startswith('DXT') or dds_format in ('ATI2', 'BC2', 'BC3', 'BC5U', 'BC5S', 'BC6H', 'BC7'):
+        return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * 16
+
+    return width * height * max(bit_count, 8) // 8
+
+def read_dds_header(filepath):
+
+    file_size = os.path.getsize(filepath)
+    if file_size < 128:
+        return None
+
+    #Only the pages holding the header are ever read, with the DX10 extension if there is one
+    with open(filepath, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as mapped:
+            header = mapped[:148]
+
+    return parse_dds_header(header, file_size)
+
+def dds_memory_size(header):
+
+    #Size of the whole mip chain once uploaded
+    total = 0
+    width, height = header["width"], header["height"]
+
+    for level in range(max(1, header["mip_count"])):
+        total += dds_level_size(header["format"], header["bit_count"], width, height)
+        width, height = max(1, width // 2), max(1, height // 2)
+
+    return total
+
+def build_texture_manifest():
+
+    #Run from Blender's Python console whenever HP_DefaultTextures changes
+    directory = default_texture_directory()
+    descriptions_path = os.path.join(os.path.dirname(__file__), "Extras", "DefaultTextures.txt")
+    descriptions = {}
+
+    if os.path.isfile(descriptions_path):
+        with open(descriptions_path, encoding = 'utf-8') as file:
+            for line in file:
+                texture_hash, separator, description = line.partition(" - ")
+                if separator:
+                    descriptions[texture_hash.strip() + ".dds"] = description.strip()
+
+    textures = []
+
+    for dds_file in sorted(f for f in os.listdir(directory) if f.endswith('.dds')):
+        filepath = os.path.join(directory, dds_file)
+        header = read_dds_header(filepath)
+
+        if header is None:
+            print("Skipping " + dds_file + " as it is not a valid DDS file.")
+            continue
+
+        with open(filepath, 'rb') as file:
+            content_hash = hashlib.sha256(file.read()).hexdigest()
+
+        textures.append({
+            "name": dds_file,
+            "size": os.path.getsize(filepath),
+            "format": header["format"],
+            "width": header["width"],
+            "height": header["height"],
+            "mip_count": header["mip_count"],
+            "sha256": content_hash,
+            "description": descriptions.get(dds_file, ""),
+        })
+
+    with open(os.path.join(directory, "manifest.json"), 'w', encoding = 'utf-8', newline = '\n') as file:
+        json.dump({"version": 1, "textures": textures}, file, indent = 4)
+        file.write("\n")
+
+    return 0
+
+def load_texture_manifest():
+
+    manifest_path = os.path.join(default_texture_directory(), "manifest.json")
+
+    if not os.path.isfile(manifest_path):
+        print("Could not find HP_DefaultTextures/manifest.json, falling back to scanning the folder.")
+        return -1
+
+    with open(manifest_path, encoding = 'utf-8') as file:
+        manifest = json.load(file)
+
+    texture_manifest.clear()
+    for entry in manifest["textures"]:
+        texture_manifest[entry["name"]] = entry
+
+    return 0
+
+def check_template_textures():
+
+    status = 0
+
+    for name in template_default_textures:
+        if name not in texture_manifest:
+            print("Default texture " + name + " used by material templates is missing from HP_DefaultTextures.")
+            status = -1
+
+    return status
+
+def register_default_hp_textures():
+
+    directory = default_texture_directory()
+
+    if texture_manifest:
+        dds_files = list(texture_manifest)
+    elif os.path.exists(directory) and os.path.isdir(directory):
         files = os.listdir(directory)
         dds_files = [f for f in files if f.endswith('.dds')]
-
-        for dds_file in dds_files:
-            filepath = os.path.join(directory, dds_file)
-            bpy.ops.image.open(filepath = filepath)
-            image = bpy.data.images.get(dds_file)
-            image.is_shared_asset = True
     else:
         print("Could not find folder HP_DefaultTextures.")
         return -1
+
+    default_texture_paths.clear()
+    for dds_file in dds_files:
+        default_texture_paths[dds_file] = os.path.join(directory, dds_file)
+
+    return 0
+
+def get_default_image(name):
+
+    image = bpy.data.images.get(name)
+
+    if image:
+        return image
+
+    if not default_texture_paths:
+        register_default_hp_textures()
+
+    filepath = default_texture_paths.get(name)
+
+    if filepath is None:
+        return None
+
+    return load_default_image(filepath)
+
+def load_default_image(filepath):
+
+    #Pixels are only read once the image is drawn or exported
+    try:
+        image = bpy.data.images.load(filepath, check_existing = True)
+    except RuntimeError:
+        print("Could not load default texture " + filepath)
+        return None
+
+    image.is_shared_asset = True
+    trace_count("images_loaded")
+
+    return image
+
+def prefetch_file(filepath):
+
+    #Pull the file into the OS cache so images.load doesn't wait on the disk
+    start = time.perf_counter()
+
+    with open(filepath, 'rb') as file:
+        while file.read(1 << 20):
+            pass
+
+    return time.perf_counter() - start
+
+def import_default_hp_textures(lazy = False):
+
+    if register_default_hp_textures() != 0:
+        return -1
+
+    trace_count("textures_registered", len(default_texture_paths))
+
+    status = 0
+
+    #Textures already loaded for another vehicle in this file are reused as is
+    pending = {dds_file: filepath for dds_file, filepath in default_texture_paths.items() if dds_file not in bpy.data.images}
+
+    #Every default texture still gets its image, lazy mode only skips reading the files ahead of time.
+    #Blender reads the pixels once an image is drawn or exported either way
+    if lazy:
+        for dds_file, filepath in pending.items():
+            if load_default_image(filepath) is None:
+                status = -1
+        return status
+
+    with ThreadPoolExecutor(max_workers = 8) as executor:
+        prefetches = {dds_file: executor.submit(prefetch_file, filepath) for dds_file, filepath in pending.items()}
+
+        for dds_file, filepath in pending.items():
+            try:
+                read_time = prefetches[dds_file].result()
+            except OSError:
+                print("Could not read default texture " + filepath)
+                status = -1
+                continue
+
+            start = time.perf_counter()
+            if load_default_image(filepath) is None:
+                status = -1
+                continue
+
+            print(f"Loaded {dds_file} (read {read_time * 1000:.1f} ms, load {(time.perf_counter() - start) * 1000:.1f} ms)")
         
-    return 0   
+    return status
+
+def asset_library_path():
+
+    preferences = addon_preferences()
+
+    if preferences and preferences.asset_library_path:
+        return bpy.path.abspath(preferences.asset_library_path)
+
+    return os.path.join(default_texture_directory(), "HPR_AssetLibrary.blend")
+
+def build_asset_library(filepath = ""):
+
+    filepath = filepath or asset_library_path()
+    status = 0
+
+    if register_default_hp_textures() != 0:
+        return -1
+
+    images = set()
+
+    for dds_file in default_texture_paths:
+        image = get_default_image(dds_file)
+
+        if image is None:
+            status = -1
+        elif image.library:
+            print("Please build the asset library from a file that doesn't link it already.")
+            return -1
+        else:
+            images.add(image)
+
+    #One material per template, for reference and to copy from
+    materials = []
+    prototypes = {}
+
+    for template in material_templates.values():
+        mat = bpy.data.materials.new("HPR_" + template.key)
+        mat.use_nodes = True
+        status += apply_material_template(mat, template, prototypes = prototypes)[0]
+        mat.name = "HPR_" + template.key
+        materials.append(mat)
+
+    #Textures stay in HP_DefaultTextures, the library only points at them
+    bpy.data.libraries.write(filepath, images | set(materials), path_remap = 'ABSOLUTE', fake_user = True)
+    bpy.data.batch_remove(materials)
+
+    print(f"Wrote {len(images)} textures and {len(materials)} template materials to {filepath}")
+
+    return status
+
+def link_asset_library(filepath = ""):
+
+    filepath = filepath or asset_library_path()
+
+    if not os.path.isfile(filepath):
+        print("Could not find asset library " + filepath + ", please build it first.")
+        return -1
+
+    #Linked images are found by name like loaded ones, so templates use them as is
+    with bpy.data.libraries.load(filepath, link = True) as (data_from, data_to):
+        data_to.images = [name for name in data_from.images if name not in bpy.data.images]
+        data_to.materials = [name for name in data_from.materials if name not in bpy.data.materials]
+
+    trace_count("images_linked", len(data_to.images))
+
+    return 0
         
 def setup_vehicle_id(car_id):
 
@@ -104,13 +602,126 @@ def setup_vehicle_id(car_id):
         
     return 0    
         
+#Corner suffix, mirrored to the right side, moved to the rear axle
+wheel_corners = (("FL", False, False), ("FR", True, False), ("RL", False, True), ("RR", True, True))
+
+#Forward axis -> (forward direction, axis the left and right wheels mirror along)
+wheel_axes = {
+    'Y': (Vector((0.0, 1.0, 0.0)), Vector((1.0, 0.0, 0.0))),
+    '-Y': (Vector((0.0, -1.0, 0.0)), Vector((1.0, 0.0, 0.0))),
+    'X': (Vector((1.0, 0.0, 0.0)), Vector((0.0, 1.0, 0.0))),
+    '-X': (Vector((-1.0, 0.0, 0.0)), Vector((0.0, 1.0, 0.0))),
+}
+
+def copy_object_materials(source, target):
+
+    #Materials set on the object rather than the mesh have to be carried over
+    for index, slot in enumerate(source.material_slots):
+        if slot.link == 'OBJECT':
+            target.material_slots[index].link = 'OBJECT'
+            target.material_slots[index].material = slot.material
+
+def world_bounds_center(objects):
+
+    #Centre of the world space bounding box around all objects, None without any
+    corners = [obj.matrix_world @ Vector(corner) for obj in objects for corner in obj.bound_box]
+
+    if not corners:
+        return None
+
+    return Vector([(min(axis) + max(axis)) / 2.0 for axis in zip(*corners)])
+
+def vehicle_center_line(car_id, side):
+
+    #Offset of the vehicle centre line along the side axis, the world origin without any graphics meshes
+    graphics_collection = bpy.data.collections.get(car_id + "_Graphics")
+    meshes = [obj for obj in graphics_collection.all_objects if obj.type == 'MESH'] if graphics_collection else []
+    center = world_bounds_center(meshes)
+
+    return center.dot(side) if center else 0.0
+
+def mirror_mesh_data(mesh, matrix):
+
+    #Copy of the mesh data with the mirror applied to the vertices. The faces are flipped back so the
+    #winding and normals face outwards again, which a negative object scale would leave inverted on export
+    mirrored = mesh.copy()
+    custom_normals = None
+
+    if mirrored.has_custom_normals:
+        mirrored.calc_normals_split()
+        normal_matrix = matrix.to_3x3().inverted_safe().transposed()
+        custom_normals = {(poly.index, mirrored.loops[index].vertex_index): (normal_matrix @ mirrored.loops[index].normal).normalized()
+                          for poly in mirrored.polygons for index in poly.loop_indices}
+
+    mirrored.transform(matrix)
+    mirrored.flip_normals()
+
+    #Flipping reorders the loops of each face, so custom normals are matched up again by face and vertex
+    if custom_normals is not None:
+        normals = [None] * len(mirrored.loops)
+        for poly in mirrored.polygons:
+            for index in poly.loop_indices:
+                normals[index] = custom_normals[(poly.index, mirrored.loops[index].vertex_index)]
+        mirrored.normals_split_custom_set(normals)
+
+    return mirrored
+
+def populate_wheels(car_id, wheelbase, forward_axis = 'Y'):
+
+    wheels_collection = bpy.data.collections.get(car_id + "_Wheels")
+    meshes = only_selected_mesh()
+
+    if wheels_collection is None:
+        print("Could not find collection " + car_id + "_Wheels, please run Prepare Collection first.")
+        return -1
+
+    if not meshes:
+        print("No meshes are selected.")
+        return -1
+
+    for mesh in meshes:
+        if mesh.parent:
+            print("Please make sure selected wheel meshes are not linked to any parent.")
+            return -1
+
+    forward, side = wheel_axes[forward_axis]
+    rear = Matrix.Translation(-wheelbase * forward)
+
+    #Mirror across the plane through the vehicle centre line
+    center = vehicle_center_line(car_id, side) * side
+    mirror = Matrix.Translation(center) @ Matrix.Scale(-1.0, 4, side) @ Matrix.Translation(-center)
+
+    #The selected assembly is the front left wheel. The rear left shares its mesh data, the right side
+    #shares one mirrored copy of it so every object keeps a positive scale
+    for mesh in meshes:
+        for collection in list(mesh.users_collection):
+            collection.objects.unlink(mesh)
+        wheels_collection.objects.link(mesh)
+
+        matrix = mesh.matrix_world.copy()
+        base_name = mesh.name
+        mesh.name = base_name + "_" + wheel_corners[0][0]
+
+        #The world space mirror moved into the object's local space
+        mirrored = mirror_mesh_data(mesh.data, matrix.inverted() @ mirror @ matrix)
+        mirrored.name = mesh.data.name + "_Mirrored"
+
+        for corner, mirrored_side, rear_axle in wheel_corners[1:]:
+            obj = bpy.data.objects.new(base_name + "_" + corner, mirrored if mirrored_side else mesh.data)
+            obj.matrix_world = (rear if rear_axle else Matrix.Identity(4)) @ matrix
+
+            copy_object_materials(mesh, obj)
+            wheels_collection.objects.link(obj)
+
+        trace_count("wheels_instanced", len(wheel_corners) - 1)
+
+    return 0
+
 def only_selected_mesh():
 
     return [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']    
         
-def apply_mesh_rotation():
-
-    meshes = only_selected_mesh()
+def check_mesh_rotation(meshes, batch = False):
     
     #If no mesh selected
     if not meshes:
@@ -127,6 +738,34 @@ def apply_mesh_rotation():
         if mesh.hide_get():
             print("Please make sure selected meshes are not hidden.")
             return -1
+
+    if batch:
+        #Objects sharing mesh data get baked once, so they must agree on the transform
+        for data, users in group_mesh_data(meshes).items():
+            if data.users > len(users):
+                print("Please make sure mesh data " + data.name + " is not shared with unselected objects.")
+                return -1
+
+            if any(user.matrix_basis != users[0].matrix_basis for user in users):
+                print("Please make sure objects sharing mesh data " + data.name + " have the same transform.")
+                return -1
+    else:
+        for mesh in meshes:
+            if mesh.data.users > 1:
+                print("Please make sure " + mesh.name + " does not share its mesh data with other objects.")
+                return -1
+
+    return 0
+
+def apply_mesh_rotation(batch = False):
+
+    meshes = only_selected_mesh()
+
+    if check_mesh_rotation(meshes, batch) != 0:
+        return -1
+
+    if batch:
+        return apply_mesh_rotation_batch(meshes)
         
     for mesh in meshes:
         #Apply transformation to mesh first before proceeding
@@ -153,666 +792,2640 @@ def apply_mesh_rotation():
         
         mesh.select_set(False)
         empty.select_set(False)
+        trace_count("meshes_parented")
             
     return 0
 
-def getMaterial():
+class MeshRotationJob:
 
-    active = bpy.context.active_object
+    #Batch parenting split into one item per mesh data, so it can also run in chunks from a modal operator
+    def __init__(self, meshes, keep_rollback = False):
+        self.view_layer = bpy.context.view_layer
+        self.collection = self.view_layer.active_layer_collection.collection
+        self.cursor_location = bpy.context.scene.cursor.location.copy()
 
-    if active and active.type == 'MESH':
-        material = active.active_material
+        #Empties are added at the cursor with no rotation, so that is what parent_set inverts
+        self.rotation_matrix = Matrix.Rotation(math.radians(-90), 4, 'X')
+        self.parent_inverse = Matrix.Translation(self.cursor_location).inverted()
 
-        if material and not material.use_nodes:
-            material.use_nodes = True
+        self.items = list(group_mesh_data(meshes).items())
+        self.keep_rollback = keep_rollback
+        self.done = []
+        self.empties = []
 
-        return active.active_material
-    
-    else:
-        return None 
+    def process(self, item):
+        data, users = item
 
-def createImageNode(mat, node_name, node_image = 'null'):
+        if self.keep_rollback:
+            self.done.append((data, read_mesh_coords(data), [(mesh, mesh.matrix_basis.copy()) for mesh in users]))
 
-    if mat:
-        nodes = mat.node_tree.nodes
-        image_node = nodes.new(type = 'ShaderNodeTexImage')
-        image_node.name = node_name
-        image_node.location = (0, 0)
+        #Apply transformation and the -90 deg rotation to mesh data in one go
+        bake_mesh_transform(data, self.rotation_matrix @ users[0].matrix_basis)
 
-        if bpy.data.images.get(node_image):
-            image_node.image = bpy.data.images.get(node_image)
-        elif node_image == 'null':
-            return 0
-        else:
-            print("Unable to find image " + node_image + " for " + node_name)
-            return -1
-        return 0
-    else:
-        print("Failed to create as " + mat.name + " is null")
-        return -1
-    
-    # node_locations = {
-    #     "NormalTextureSampler": (-300, 300),
-    #     "DiffuseTextureSampler": (-300, 0),
-    #     "AoMapTextureSampler": (-300, -300),
-    #     "ScratchTextureSampler": (-600, 300),
-    #     "LightmapLightsTextureSampler": (-600, 0),
-    #     "CrackedGlassTextureSampler": (-600, -300),
-    #     "CrackedGlassNormalTextureSampler": (500, 300),
-    #     "EmissiveTextureSampler": (500, 0),
-    #     "CrumpleTextureSampler": (500, -300),
-    #     "ExternalNormalTextureSampler": (800, 300),
-    #     "InternalNormalTextureSampler": (800, 0),
-    #     "DisplacementSampler": (800, -300),
-    #     "DiffuseSampler": (800, -600),
-    #     "BlurNormalTextureSampler": (500, -600),
-    #     "BlurDiffuseTextureSampler": (200, -600),
-    #     "SpecularAndAOTextureSampler": (-100, -600),
-    #     "BlurSpecularAndAOTextureSampler": (-400, -600),
-    # }
-    # image_node.location = node_locations.get(node_name, (0, 0))
+        for mesh in users:
+            mesh.matrix_basis = Matrix.Identity(4)
 
-def createMaterialCustomProperty(mat, name, values):
+            #Create parent, already rotated +90 deg
+            empty = bpy.data.objects.new("Empty_" + mesh.name, None)
+            empty.empty_display_type = 'PLAIN_AXES'
+            empty.location = self.cursor_location
+            empty.rotation_euler = (math.radians(90), 0.0, 0.0)
+            self.collection.objects.link(empty)
+            self.empties.append(empty)
 
-    if name not in mat:
-        mat[name] = values  #Values should be array of size 4
-    else:
-        print(name + " already exists in Material: " + mat.name)
-        return -1
+            mesh.parent = empty
+            mesh.matrix_parent_inverse = self.parent_inverse
+            mesh.select_set(False)
 
-    special_names = {'DirtTint', 'materialDiffuse', 'LightmappedLightsGreenChannelColour', 'LightmappedLightsBlueChannelColour',
-                'LightmappedLightsRedChannelColour', 'window_Tint', 'pearlescentColour', 'ReversingColour', 'UnusedColour',
-                'mCrackedGlassSpecularColour', 'BrakeColour', 'RunningColour', 'mGlassColour', 'OverlayA_Diffuse', 'DiffuseB',
-                'OverlayB_Diffuse', 'DiffuseA', 'Colour', 'gEmissiveColour', 'tiling1Diffuse', 'tiling3Diffuse', 'tiling2Diffuse',
-                'decal_Diffuse', 'mMaterialDiffuse', 'Line_Diffuse', 'DiffuseColour', 'EmissiveColour', 'algaeColour', 'mExternalGlassColour'}
-    
-    if name in special_names:
-        property_manager = mat.id_properties_ui(name)
-        property_manager.update(subtype='COLOR')
+        trace_count("meshes_parented", len(users))
 
-    return 0
+        return 0
 
-def material_Badge(mat):
+    def finish(self):
+        if self.empties:
+            self.view_layer.objects.active = self.empties[-1]
+        self.view_layer.update()
 
-    status = 0
+    def rollback(self):
+        for data, coords, users in reversed(self.done):
+            write_mesh_coords(data, coords)
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Greyscale_Textured_Normalmapped_Reflective"
-        mat.name = "Badge_" + mat.name
+            for mesh, matrix in users:
+                mesh.parent = None
+                mesh.matrix_parent_inverse = Matrix.Identity(4)
+                mesh.matrix_basis = matrix
+                mesh.select_set(True)
 
-        status += createImageNode(mat, "NormalTextureSampler", 'E7_A5_A4_93.dds')
-        status += createImageNode(mat, "DiffuseTextureSampler")
+        bpy.data.batch_remove(self.empties)
+        self.done.clear()
+        self.empties.clear()
+        self.view_layer.update()
 
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [3.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [0.0010000000474974513, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [0.013000000268220901, 0.30000001192092896, 3.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.5, 1.0, 60.0, 1.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [0.0, 0.0, 0.0, 1.0])
+def apply_mesh_rotation_batch(meshes):
 
-    return status, "Badge"
+    #Same result as the operator path above, without a depsgraph update per mesh
+    job = MeshRotationJob(meshes)
 
-def material_Glass(mat):
+    for item in job.items:
+        job.process(item)
 
-    status = 0
+    job.finish()
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Glass_Emissive_Coloured"
-        mat.name = "Glass_" + mat.name
+    return 0
 
-        status += createImageNode(mat, "EmissiveTextureSampler", '89_20_8C_6D.dds')
-        status += createImageNode(mat, "CrackedGlassTextureSampler", 'BE_12_78_F1.dds')
-        status += createImageNode(mat, "CrackedGlassNormalTextureSampler", '52_5D_C3_15.dds')
+def group_mesh_data(meshes):
 
-        status += createMaterialCustomProperty(mat, "BrakeColour", [0.25, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "ReversingColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "RunningColour", [0.07035999745130539, 0.07035999745130539, 0.07035999745130539, 1.0])
-        status += createMaterialCustomProperty(mat, "UnusedColour", [0.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mCrackedGlassSpecularColour", [0.19599999487400055, 0.6549999713897705, 0.7879999876022339, 1.0])
-        status += createMaterialCustomProperty(mat, "mCrackedGlassSpecularControls", [0.10999999940395355, 3.5, 1.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mGlassColour", [0.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mGlassControls", [0.03999999910593033, 1.0, 3.0, 0.9900000095367432])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
+    users = {}
 
-    return status, "Glass"
+    for mesh in meshes:
+        users.setdefault(mesh.data, []).append(mesh)
 
-def material_GlassRed(mat):
+    return users
 
-    status = 0
+def mesh_coord_blocks(data):
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Glass_Emissive_Coloured"
-        mat.name = "GlassRed_" + mat.name
+    blocks = [data.vertices]
+    if data.shape_keys:
+        blocks += [key.data for key in data.shape_keys.key_blocks]
 
-        status += createImageNode(mat, "EmissiveTextureSampler", '89_20_8C_6D.dds')
-        status += createImageNode(mat, "CrackedGlassTextureSampler", 'BE_12_78_F1.dds')
-        status += createImageNode(mat, "CrackedGlassNormalTextureSampler", '52_5D_C3_15.dds')
+    return blocks
 
-        status += createMaterialCustomProperty(mat, "BrakeColour", [0.25, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "ReversingColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "RunningColour", [0.0822829976677895, 0.00367700005881488, 0.00439100014045835, 1.0])
-        status += createMaterialCustomProperty(mat, "UnusedColour", [0.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mCrackedGlassSpecularColour", [0.19599999487400055, 0.6549999713897705, 0.7879999876022339, 1.0])
-        status += createMaterialCustomProperty(mat, "mCrackedGlassSpecularControls", [0.10999999940395355, 3.5, 1.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mGlassColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mGlassControls", [0.0149999996647239, 0.600000023841858, 3.0, 0.800000011920929])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
+def read_mesh_coords(data):
 
-    return status, "GlassRed"
+    coords = []
 
-def material_GlassLivery(mat):
+    for block in mesh_coord_blocks(data):
+        block_coords = numpy.empty(len(data.vertices) * 3, dtype = numpy.float32)
+        block.foreach_get("co", block_coords)
+        coords.append(block_coords)
 
-    status = 0
+    return coords
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Glass_Emissive_Coloured_Singlesided_Wrap"
-        mat.name = "GlassRed_" + mat.name
+def write_mesh_coords(data, coords):
 
-        status += createImageNode(mat, "EmissiveTextureSampler", '89_20_8C_6D.dds')
-        status += createImageNode(mat, "CrackedGlassTextureSampler", 'BE_12_78_F1.dds')
-        status += createImageNode(mat, "CrackedGlassNormalTextureSampler", '52_5D_C3_15.dds')
+    for block, block_coords in zip(mesh_coord_blocks(data), coords):
+        block.foreach_set("co", block_coords)
 
-        status += createMaterialCustomProperty(mat, "BrakeColour", [0.25, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "ReversingColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "RunningColour", [0.07035999745130539, 0.07035999745130539, 0.07035999745130539, 1.0])
-        status += createMaterialCustomProperty(mat, "UnusedColour", [0.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mCrackedGlassSpecularColour", [0.19599999487400055, 0.6549999713897705, 0.7879999876022339, 1.0])
-        status += createMaterialCustomProperty(mat, "mCrackedGlassSpecularControls", [0.10999999940395355, 3.5, 1.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mGlassColour", [0.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mGlassControls", [0.03999999910593033, 1.0, 3.0, 0.9900000095367432])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
+    data.update()
 
-    return status, "GlassLivery"
+def bake_mesh_transform(data, matrix):
 
-def material_GlassSurround(mat):
+    #Vertex normals are derived from positions and custom normals are stored relative to faces,
+    #so rotating positions (and shape keys) is all Mesh.transform does as well
+    rotation = numpy.array(matrix.to_3x3(), dtype = numpy.float32).T
+    translation = numpy.array(matrix.translation, dtype = numpy.float32)
 
-    status = 0
+    coords = numpy.empty(len(data.vertices) * 3, dtype = numpy.float32)
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Glass_Emissive_Coloured_Singlesided_Wrap"
-        mat.name = "GlassSurround_" + mat.name
+    for block in mesh_coord_blocks(data):
+        block.foreach_get("co", coords)
+        block.foreach_set("co", (coords.reshape(-1, 3) @ rotation + translation).ravel())
 
-        status += createImageNode(mat, "EmissiveTextureSampler", '89_20_8C_6D.dds')
-        status += createImageNode(mat, "CrackedGlassTextureSampler", 'BE_12_78_F1.dds')
-        status += createImageNode(mat, "CrackedGlassNormalTextureSampler", '52_5D_C3_15.dds')
+    data.update()
 
-        status += createMaterialCustomProperty(mat, "BrakeColour", [0.25, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "ReversingColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "RunningColour", [0.07035999745130539, 0.07035999745130539, 0.07035999745130539, 1.0])
-        status += createMaterialCustomProperty(mat, "UnusedColour", [0.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mCrackedGlassSpecularColour", [0.19599999487400055, 0.6549999713897705, 0.7879999876022339, 1.0])
-        status += createMaterialCustomProperty(mat, "mCrackedGlassSpecularControls", [0.10999999940395355, 3.5, 1.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mGlassColour", [0.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mGlassControls", [0.03999999910593033, 1.0, 3.5, 0.7400000095367432])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
+def read_triangles(data):
 
-    return status, "GlassSurround"
+    #Flat list of vertex indices, three per triangle, for a mesh that is already triangulated
+    loop_starts = numpy.empty(len(data.polygons), dtype = numpy.int32)
+    loops = numpy.empty(len(data.loops), dtype = numpy.int32)
+    data.polygons.foreach_get("loop_start", loop_starts)
+    data.loops.foreach_get("vertex_index", loops)
 
-def material_Grille(mat):
+    return loops[(loop_starts[:, None] + numpy.arange(3, dtype = numpy.int32)).ravel()].tolist()
 
-    status = 0
+def vertex_triangle_adjacency(indices, vertex_count):
 
-    if mat:
-        mat["shader_type"] = "Vehicle_1Bit_Textured_NormalMapped_Emissive_AO_Livery"
-        mat.name = "Grille_" + mat.name
-
-        status += createImageNode(mat, "NormalTextureSampler", 'E7_A5_A4_93.dds')
-        status += createImageNode(mat, "DiffuseTextureSampler")
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
-
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [60.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mScratchSpecularControls", [0.009999999776482582, 0.15000000596046448, 5.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [0.0010000000474974513, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.04, 0.7, 35.0, 0.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [0.0, 0.0, 0.0, 1.0])
-
-    return status, "Grille"
-
-def material_Interior(mat):
+    #Triangles of each vertex as offsets into one list, built with a counting pass so it stays linear
+    offsets = [0] * (vertex_count + 1)
+    for vertex in indices:
+        offsets[vertex + 1] += 1
+    for vertex in range(vertex_count):
+        offsets[vertex + 1] += offsets[vertex]
 
-    status = 0
+    adjacency = [0] * len(indices)
+    fill = offsets[:-1]
+    for index, vertex in enumerate(indices):
+        adjacency[fill[vertex]] = index // 3
+        fill[vertex] += 1
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Textured_Phong"
-        mat.name = "Interior_" + mat.name
+    return offsets, adjacency
 
-        status += createImageNode(mat, "DiffuseTextureSampler")
+def average_cache_miss_ratio(indices, vertex_count, cache_size):
 
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [1.0, 0.699999988079071, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.0500000007450581, 0.850000023841858, 2.0, 1.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [0.00150000001303852, 0.0, 0.0, 0.0])
+    #FIFO post-transform cache, a vertex hits while fewer than cache_size misses happened since it was loaded
+    loaded = [-cache_size - 1] * vertex_count
+    misses = 0
 
-    return status, "Interior"
+    for vertex in indices:
+        if misses - loaded[vertex] > cache_size:
+            loaded[vertex] = misses
+            misses += 1
 
-def material_InteriorEmissive(mat):
+    return misses / max(1, len(indices) // 3)
 
-    status = 0
+def optimize_triangle_order(indices, vertex_count, cache_size):
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Textured_NormalMapped_Emissive_AO"
-        mat.name = "InteriorEmissive_" + mat.name
+    #Tipsify (Sander et al. 2007): fan out around a vertex while it is likely still cached,
+    #every triangle and vertex is visited a constant number of times
+    offsets, adjacency = vertex_triangle_adjacency(indices, vertex_count)
+    live = [offsets[vertex + 1] - offsets[vertex] for vertex in range(vertex_count)]
+    cache_time = [-cache_size - 1] * vertex_count
+    emitted = [False] * (len(indices) // 3)
+    dead_ends = []
+    order = []
+    time_stamp = cache_size + 1
+    cursor = 0
+    fanning = 0 if vertex_count else -1
 
-        status += createImageNode(mat, "NormalTextureSampler", 'E7_A5_A4_93.dds')
-        status += createImageNode(mat, "DiffuseTextureSampler")
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
+    while fanning >= 0:
+        candidates = []
 
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 0.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
+        for triangle in adjacency[offsets[fanning]:offsets[fanning + 1]]:
+            if emitted[triangle]:
+                continue
 
-    return status, "InteriorEmissive"
+            for vertex in indices[triangle * 3:triangle * 3 + 3]:
+                dead_ends.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
 
-def material_Lights(mat):
+                if time_stamp - cache_time[vertex] > cache_size:
+                    cache_time[vertex] = time_stamp
+                    time_stamp += 1
 
-    status = 0
+            emitted[triangle] = True
+            order.append(triangle)
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Textured_NormalMapped_Reflective_Emissive_AO"
-        mat.name = "Lights_" + mat.name
+        #Next fanning vertex is the one that stays cached the longest while it still has triangles left
+        fanning = -1
+        best_priority = -1
 
-        status += createImageNode(mat, "NormalTextureSampler", 'E7_A5_A4_93.dds')
-        status += createImageNode(mat, "DiffuseTextureSampler")
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
+        for vertex in candidates:
+            if live[vertex] > 0:
+                priority = 0
+                if time_stamp - cache_time[vertex] + 2 * live[vertex] <= cache_size:
+                    priority = time_stamp - cache_time[vertex]
+                if priority > best_priority:
+                    best_priority = priority
+                    fanning = vertex
 
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [0.0099999997764825820, 0.5, 3.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 0.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
+        if fanning >= 0:
+            continue
 
-    return status, "Lights"
+        while dead_ends:
+            vertex = dead_ends.pop()
+            if live[vertex] > 0:
+                fanning = vertex
+                break
 
-def material_MetalChrome(mat):
+        if fanning >= 0:
+            continue
 
-    status = 0
+        while cursor < vertex_count:
+            if live[cursor] > 0:
+                fanning = cursor
+                break
+            cursor += 1
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Emissive_Reflective_AO"
-        mat.name = "MetalChrome_" + mat.name
+    return order
 
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
+def optimize_vertex_order(indices, triangle_order, vertex_count):
 
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [0.0099999997764825820, 0.8500000238, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 0.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
+    #Vertices get numbered in the order the triangles first use them, unused ones go last
+    remap = [-1] * vertex_count
+    next_index = 0
 
-    return status, "MetalChrome"
+    for triangle in triangle_order:
+        for vertex in indices[triangle * 3:triangle * 3 + 3]:
+            if remap[vertex] < 0:
+                remap[vertex] = next_index
+                next_index += 1
 
-def material_MetalColorable(mat):
+    for vertex in range(vertex_count):
+        if remap[vertex] < 0:
+            remap[vertex] = next_index
+            next_index += 1
 
-    status = 0
+    return remap
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_Wrap"
-        mat.name = "MetalColorable_" + mat.name
+def optimize_mesh_cache(data, cache_size):
 
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "CrumpleTextureSampler", '11_BF_74_F7.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
+    bm = bmesh.new()
+    bm.from_mesh(data)
+    bmesh.ops.triangulate(bm, faces = bm.faces[:])
 
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mPaintColourIndex", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
+    #Mesh and BMesh indices line up after writing the triangulated mesh back
+    bm.verts.index_update()
+    bm.faces.index_update()
+    bm.to_mesh(data)
 
-    return status, "MetalColorable"
+    vertex_count = len(data.vertices)
+    indices = read_triangles(data)
+    before = average_cache_miss_ratio(indices, vertex_count, cache_size)
 
-def material_MetalHalfLivery(mat):
+    triangle_order = optimize_triangle_order(indices, vertex_count, cache_size)
+    vertex_remap = optimize_vertex_order(indices, triangle_order, vertex_count)
+
+    triangle_rank = [0] * len(triangle_order)
+    for rank, triangle in enumerate(triangle_order):
+        triangle_rank[triangle] = rank
 
-    status = 0
+    #BMesh reorders every layer (UVs, normals, shape keys, vertex groups) along with the elements
+    bm.faces.sort(key = lambda face: triangle_rank[face.index])
+    bm.verts.sort(key = lambda vertex: vertex_remap[vertex.index])
+    bm.to_mesh(data)
+    bm.free()
+    data.update()
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_Livery"
-        mat.name = "MetalHalfLivery_" + mat.name
+    optimized = [vertex_remap[vertex] for triangle in triangle_order for vertex in indices[triangle * 3:triangle * 3 + 3]]
+    after = average_cache_miss_ratio(optimized, vertex_count, cache_size)
 
-        status += createImageNode(mat, "DiffuseTextureSampler")
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "CrumpleTextureSampler", '11_BF_74_F7.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
+    return before, after
 
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mPaintColourIndex", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
+def optimize_vertex_cache(meshes, cache_size = 16):
 
-    return status, "MetalHalfLivery"
+    if not meshes:
+        print("No meshes are selected.")
+        return -1
 
-def material_MetalLiveryCarbon(mat):
+    print(f"{'Mesh':<48}{'Triangles':>10}{'ACMR before':>14}{'ACMR after':>14}")
 
-    status = 0
+    #Objects sharing mesh data only need it optimized once
+    for data, users in group_mesh_data(meshes).items():
+        if data.library:
+            print("Skipping " + data.name + " as it is linked from " + data.library.filepath)
+            continue
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_ColourOverride_Livery"
-        mat.name = "MetalLiveryCarbon_" + mat.name
-
-        status += createImageNode(mat, "DiffuseTextureSampler", '90_73_F3_CE.dds')
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "CrumpleTextureSampler", '11_BF_74_F7.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
-
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 0.699999988079071, 1.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mDiffuseFresnel", [1.5, 0.0, 4.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEnvSpecularControls", [0.44999998807907104, 0.20000000298023224, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mPearlescentPower", [20.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [0.019999999552965164, 0.4000000059604645, 12.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mScratchSpecularControls", [0.4000000059604645, 0.15000000596046448, 50.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [3.0, 0.4000000059604645, 35.0, 0.9800000190734863])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "pearlescentColour", [1.0, 1.0, 1.0, 1.0])
-
-    return status, "MetalLiveryCarbon"
-
-def material_MetalLiveryGloss(mat):
+        before, after = optimize_mesh_cache(data, cache_size)
+        print(f"{data.name:<48}{len(data.polygons):>10}{before:>14.3f}{after:>14.3f}")
+        trace_count("triangles_optimized", len(data.polygons))
 
-    status = 0
+    return 0
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_ColourOverride_Livery"
-        mat.name = "MetalLiveryGloss_" + mat.name
-
-        status += createImageNode(mat, "DiffuseTextureSampler")
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "CrumpleTextureSampler", '11_BF_74_F7.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
-
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mDiffuseFresnel", [1.0, 0.75, 5.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEnvSpecularControls", [1.0, 0.20000000298023224, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mPearlescentPower", [4.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [0.0099999997764825820, 0.600000023841858, 5.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mScratchSpecularControls", [0.25, 0.25, 20.0, 0.20000000298023224])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 1.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "pearlescentColour", [1.0, 1.0, 1.0, 1.0])
-
-    return status, "MetalLiveryGloss"
-
-def material_MetalLiveryMatte(mat):
+def mesh_layers(mesh):
+
+    #Names and types of the layers mesh_to_arrays() writes, passed along with the arrays
+    return {
+        "uv_layers": [layer.name for layer in mesh.uv_layers],
+        "color_attributes": [[attribute.name, attribute.domain, attribute.data_type] for attribute in mesh.color_attributes],
+        "auto_smooth": [mesh.use_auto_smooth, mesh.auto_smooth_angle],
+    }
+
+def mesh_to_arrays(mesh, prefix = ""):
+
+    #Flat arrays of everything a LOD needs, so meshes can be passed to other Blender processes
+    arrays = {
+        prefix + "vertices": numpy.empty(len(mesh.vertices) * 3, dtype = numpy.float32),
+        prefix + "loops": numpy.empty(len(mesh.loops), dtype = numpy.int32),
+        prefix + "loop_starts": numpy.empty(len(mesh.polygons), dtype = numpy.int32),
+        prefix + "loop_totals": numpy.empty(len(mesh.polygons), dtype = numpy.int32),
+        prefix + "material_indices": numpy.empty(len(mesh.polygons), dtype = numpy.int32),
+        prefix + "smooth": numpy.empty(len(mesh.polygons), dtype = bool),
+        prefix + "edges": numpy.empty(len(mesh.edges) * 2, dtype = numpy.int32),
+        prefix + "sharp_edges": numpy.empty(len(mesh.edges), dtype = bool),
+    }
+
+    mesh.vertices.foreach_get("co", arrays[prefix + "vertices"])
+    mesh.loops.foreach_get("vertex_index", arrays[prefix + "loops"])
+    mesh.polygons.foreach_get("loop_start", arrays[prefix + "loop_starts"])
+    mesh.polygons.foreach_get("loop_total", arrays[prefix + "loop_totals"])
+    mesh.polygons.foreach_get("material_index", arrays[prefix + "material_indices"])
+    mesh.polygons.foreach_get("use_smooth", arrays[prefix + "smooth"])
+    mesh.edges.foreach_get("vertices", arrays[prefix + "edges"])
+    mesh.edges.foreach_get("use_edge_sharp", arrays[prefix + "sharp_edges"])
+
+    for index, layer in enumerate(mesh.uv_layers):
+        uvs = numpy.empty(len(mesh.loops) * 2, dtype = numpy.float32)
+        layer.data.foreach_get("uv", uvs)
+        arrays[prefix + "uv_" + str(index)] = uvs
+
+    for index, attribute in enumerate(mesh.color_attributes):
+        colors = numpy.empty(len(attribute.data) * 4, dtype = numpy.float32)
+        attribute.data.foreach_get("color", colors)
+        arrays[prefix + "color_" + str(index)] = colors
 
-    status = 0
+    if mesh.has_custom_normals:
+        mesh.calc_normals_split()
+        normals = numpy.empty(len(mesh.loops) * 3, dtype = numpy.float32)
+        mesh.loops.foreach_get("normal", normals)
+        arrays[prefix + "normals"] = normals
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_ColourOverride_Livery"
-        mat.name = "MetalLiveryMatte_" + mat.name
-
-        status += createImageNode(mat, "DiffuseTextureSampler")
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "CrumpleTextureSampler", '11_BF_74_F7.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
-
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mDiffuseFresnel", [1.0, 0.75, 5.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEnvSpecularControls", [1.0, 0.20000000298023224, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "mPearlescentPower", [4.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [0.0, 0.0, 5.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mScratchSpecularControls", [0.25, 0.25, 20.0, 0.20000000298023224])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.100000001490116, 0.10000000149011612, 4.0, 1.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "pearlescentColour", [1.0, 1.0, 1.0, 1.0])
-
-    return status, "MetalLiveryMatte"
-
-def material_MetalSecondaryColouredLivery(mat):
+    return arrays
 
-    status = 0
+def mesh_from_arrays(name, arrays, prefix = "", layers = None):
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Two_PaintGloss_Textured_LightmappedLights_Livery_Wrap"
-        mat.name = "MetalSecondaryColouredLivery_" + mat.name
+    layers = layers or {}
+    mesh = bpy.data.meshes.new(name)
 
-        status += createImageNode(mat, "DiffuseTextureSampler")
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "CrumpleTextureSampler", '11_BF_74_F7.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
+    mesh.vertices.add(len(arrays[prefix + "vertices"]) // 3)
+    mesh.loops.add(len(arrays[prefix + "loops"]))
+    mesh.polygons.add(len(arrays[prefix + "loop_starts"]))
 
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
+    mesh.vertices.foreach_set("co", arrays[prefix + "vertices"])
+    mesh.loops.foreach_set("vertex_index", arrays[prefix + "loops"])
+    mesh.polygons.foreach_set("loop_start", arrays[prefix + "loop_starts"])
+    mesh.polygons.foreach_set("loop_total", arrays[prefix + "loop_totals"])
+    mesh.polygons.foreach_set("material_index", arrays[prefix + "material_indices"])
+    mesh.polygons.foreach_set("use_smooth", arrays[prefix + "smooth"])
 
-    return status, "MetalSecondaryColouredLivery"
+    mesh.update(calc_edges = True)
 
-def material_OpaqueDULL(mat):
+    #Edges are rebuilt in another order, so sharp ones are matched by their vertices
+    vertex_count = len(mesh.vertices)
+    old_edges = arrays[prefix + "edges"].reshape(-1, 2).astype(numpy.int64)
+    sharp = old_edges[arrays[prefix + "sharp_edges"]]
 
-    status = 0
+    if len(sharp):
+        new_edges = numpy.empty(len(mesh.edges) * 2, dtype = numpy.int32)
+        mesh.edges.foreach_get("vertices", new_edges)
+        new_edges = numpy.sort(new_edges.reshape(-1, 2).astype(numpy.int64), axis = 1)
+        sharp = numpy.sort(sharp, axis = 1)
+        mesh.edges.foreach_set("use_edge_sharp", numpy.isin(new_edges[:, 0] * vertex_count + new_edges[:, 1],
+                                                            sharp[:, 0] * vertex_count + sharp[:, 1]))
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Textured"
-        mat.name = "OpaqueDULL_" + mat.name
+    for index, layer_name in enumerate(layers.get("uv_layers", ())):
+        layer = mesh.uv_layers.new(name = layer_name)
+        layer.data.foreach_set("uv", arrays[prefix + "uv_" + str(index)])
 
-        status += createImageNode(mat, "DiffuseTextureSampler")
+    for index, (attribute_name, domain, data_type) in enumerate(layers.get("color_attributes", ())):
+        attribute = mesh.color_attributes.new(attribute_name, data_type, domain)
+        attribute.data.foreach_set("color", arrays[prefix + "color_" + str(index)])
 
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 1.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
+    use_auto_smooth, auto_smooth_angle = layers.get("auto_smooth", (False, math.radians(30)))
+    mesh.use_auto_smooth = use_auto_smooth
+    mesh.auto_smooth_angle = auto_smooth_angle
 
-    return status, "OpaqueDULL"
+    #Custom normals only apply with auto smooth on
+    if prefix + "normals" in arrays:
+        mesh.use_auto_smooth = True
+        mesh.normals_split_custom_set(arrays[prefix + "normals"].reshape(-1, 3))
 
-def material_PlasticBlack(mat):
+    #Only checked once every layer is back, fixing the geometry earlier would leave the layer arrays the wrong length
+    if mesh.validate():
+        print("Fixed invalid geometry in " + name + ", some of its faces or layers may have changed.")
+
+    return mesh
+
+def triangle_count(data):
+
+    return len(data.loops) - 2 * len(data.polygons)
+
+def lod_collection(vehicle_collection, source_collection, level):
+
+    #<id>_Graphics_LOD1 next to <id>_Graphics, <id>_Wheels_LOD1 next to <id>_Wheels.
+    #No resource_type, so nothing looking for specs takes a LOD for another one
+    name = source_collection.name + "_LOD" + str(level)
+    collection = bpy.data.collections.get(name)
+
+    if collection is None:
+        collection = bpy.data.collections.new(name)
+        collection["lod"] = level
+        collection["lod_source"] = source_collection.name
+        vehicle_collection.children.link(collection)
+
+    return collection
+
+def remove_lods(vehicle_collection):
+
+    objects = {obj for obj in vehicle_collection.all_objects if "hpr_lod" in obj}
+    meshes = {obj.data for obj in objects}
+
+    def find_orphans():
+        orphans = {mesh for mesh in meshes if mesh.users == 0}
+        meshes.difference_update(orphans)
+        return orphans
+
+    if objects:
+        remove_datablocks(objects, find_orphans)
+
+def run_lod_worker(blender, job_path):
+
+    command = [blender, "-b", "--factory-startup", "--python-exit-code", "1", "--python",
+               os.path.join(os.path.dirname(__file__), "hpr_lod.py"), "--", job_path]
+    result = subprocess.run(command, stdout = subprocess.PIPE, stderr = subprocess.STDOUT, text = True)
+
+    return result.returncode, result.stdout
+
+def generate_lods(car_id, ratios, workers):
+
+    vehicle_collection = bpy.data.collections.get("VEH_" + car_id + "_MS")
+
+    if vehicle_collection is None:
+        print("Could not find collection VEH_" + car_id + "_MS, please run Prepare Collection first.")
+        return -1
+
+    if not ratios or any(ratio <= 0.0 or ratio >= 1.0 for ratio in ratios):
+        print("LOD ratios have to be between 0 and 1.")
+        return -1
+
+    if not os.path.isfile(os.path.join(os.path.dirname(__file__), "hpr_lod.py")):
+        print("Could not find hpr_lod.py next to the add-on.")
+        return -1
+
+    #LODs from an earlier run are replaced
+    remove_lods(vehicle_collection)
+    collections = {vehicle_collection} | set(vehicle_collection.children_recursive)
+
+    sources = list(group_mesh_data([obj for obj in vehicle_collection.all_objects if obj.type == 'MESH']).items())
+
+    if not sources:
+        print("No meshes found in VEH_" + car_id + "_MS.")
+        return -1
+
+    #Largest meshes first onto the least loaded worker keeps the chunks balanced
+    chunks = [[] for index in range(min(workers, len(sources)))]
+    loads = [0] * len(chunks)
+
+    for index in sorted(range(len(sources)), key = lambda index: -triangle_count(sources[index][0])):
+        chunk = loads.index(min(loads))
+        chunks[chunk].append(index)
+        loads[chunk] += triangle_count(sources[index][0])
+
+    directory = tempfile.mkdtemp(prefix = "hpr_lod_")
+    jobs = []
+
+    try:
+        for chunk_index, chunk in enumerate(chunks):
+            arrays = {}
+            for index in chunk:
+                arrays.update(mesh_to_arrays(sources[index][0], str(index) + "_"))
+
+            job = {
+                "input": os.path.join(directory, str(chunk_index) + "_input.npz"),
+                "output": os.path.join(directory, str(chunk_index) + "_output.npz"),
+                "ratios": ratios,
+                "meshes": [{"key": str(index), "layers": mesh_layers(sources[index][0])} for index in chunk],
+            }
+            numpy.savez(job["input"], **arrays)
+
+            job_path = os.path.join(directory, str(chunk_index) + "_job.json")
+            with open(job_path, 'w', encoding = 'utf-8') as file:
+                json.dump(job, file)
+            jobs.append((job_path, job))
+
+        with ThreadPoolExecutor(max_workers = len(jobs)) as executor:
+            results = list(executor.map(lambda job: run_lod_worker(bpy.app.binary_path, job[0]), jobs))
+
+        status = 0
+
+        for (job_path, job), (returncode, output) in zip(jobs, results):
+            if returncode != 0:
+                print(output)
+                status = -1
+                continue
+
+            arrays = numpy.load(job["output"])
+
+            for entry in job["meshes"]:
+                data, users = sources[int(entry["key"])]
+
+                for level in range(1, len(ratios) + 1):
+                    lod_mesh = mesh_from_arrays(data.name + "_LOD" + str(level), arrays, entry["key"] + "_" + str(level) + "_", entry["layers"])
+                    for mat in data.materials:
+                        lod_mesh.materials.append(mat)
+
+                    #Same Empty parent and transform as the full detail mesh
+                    for user in users:
+                        source_collection = next(collection for collection in user.users_collection if collection in collections)
+                        obj = bpy.data.objects.new(user.name + "_LOD" + str(level), lod_mesh)
+                        obj.parent = user.parent
+                        obj.matrix_parent_inverse = user.matrix_parent_inverse.copy()
+                        obj.matrix_basis = user.matrix_basis.copy()
+                        obj["hpr_lod"] = level
+                        copy_object_materials(user, obj)
+                        lod_collection(vehicle_collection, source_collection, level).objects.link(obj)
+
+                    trace_count("lod_triangles", triangle_count(lod_mesh))
+
+            trace_count("meshes_decimated", len(job["meshes"]))
+    finally:
+        shutil.rmtree(directory, ignore_errors = True)
+
+    return status
+
+def getMaterial():
+
+    active = bpy.context.active_object
+
+    if active and active.type == 'MESH':
+        material = active.active_material
+
+        if material and not material.use_nodes:
+            material.use_nodes = True
+
+        return active.active_material
+    
+    else:
+        return None 
+
+def createImageNode(mat, node_name, node_image = 'null', image = None):
+
+    if mat:
+        nodes = mat.node_tree.nodes
+        image_node = nodes.new(type = 'ShaderNodeTexImage')
+        image_node.name = node_name
+        image_node.location = (0, 0)
+        trace_count("image_nodes_created")
+
+        if image is None and node_image != 'null':
+            image = get_default_image(node_image)
+
+        if image:
+            image_node.image = image
+        elif node_image == 'null':
+            return 0
+        else:
+            print("Unable to find image " + node_image + " for " + node_name)
+            return -1
+        return 0
+    else:
+        print("Failed to create as " + mat.name + " is null")
+        return -1
+    
+    # node_locations = {
+    #     "NormalTextureSampler": (-300, 300),
+    #     "DiffuseTextureSampler": (-300, 0),
+    #     "AoMapTextureSampler": (-300, -300),
+    #     "ScratchTextureSampler": (-600, 300),
+    #     "LightmapLightsTextureSampler": (-600, 0),
+    #     "CrackedGlassTextureSampler": (-600, -300),
+    #     "CrackedGlassNormalTextureSampler": (500, 300),
+    #     "EmissiveTextureSampler": (500, 0),
+    #     "CrumpleTextureSampler": (500, -300),
+    #     "ExternalNormalTextureSampler": (800, 300),
+    #     "InternalNormalTextureSampler": (800, 0),
+    #     "DisplacementSampler": (800, -300),
+    #     "DiffuseSampler": (800, -600),
+    #     "BlurNormalTextureSampler": (500, -600),
+    #     "BlurDiffuseTextureSampler": (200, -600),
+    #     "SpecularAndAOTextureSampler": (-100, -600),
+    #     "BlurSpecularAndAOTextureSampler": (-400, -600),
+    # }
+    # image_node.location = node_locations.get(node_name, (0, 0))
+
+color_property_names = {'DirtTint', 'materialDiffuse', 'LightmappedLightsGreenChannelColour', 'LightmappedLightsBlueChannelColour',
+            'LightmappedLightsRedChannelColour', 'window_Tint', 'pearlescentColour', 'ReversingColour', 'UnusedColour',
+            'mCrackedGlassSpecularColour', 'BrakeColour', 'RunningColour', 'mGlassColour', 'OverlayA_Diffuse', 'DiffuseB',
+            'OverlayB_Diffuse', 'DiffuseA', 'Colour', 'gEmissiveColour', 'tiling1Diffuse', 'tiling3Diffuse', 'tiling2Diffuse',
+            'decal_Diffuse', 'mMaterialDiffuse', 'Line_Diffuse', 'DiffuseColour', 'EmissiveColour', 'algaeColour', 'mExternalGlassColour'}
+
+def createMaterialCustomProperty(mat, name, values):
+
+    if name not in mat:
+        mat[name] = values  #Values should be array of size 4
+        trace_count("properties_written")
+    else:
+        print(name + " already exists in Material: " + mat.name)
+        return -1
+
+    if name in color_property_names:
+        property_manager = mat.id_properties_ui(name)
+        property_manager.update(subtype='COLOR')
+
+    return 0
+
+#Bump whenever template values change, so materials set up with older values get updated
+material_template_version = 1
+
+#Material templates, compiled into material_templates by compile_material_templates() on register
+#alpha_samplers lists the samplers that need a texture with alpha (DXT5)
+material_template_table = [
+    {
+        "key": 'Badge',
+        "name": "Badge",
+        "label": "Badge",
+        "description": "Material for badges, which supports transparency",
+        "shader_type": "Vehicle_Greyscale_Textured_Normalmapped_Reflective",
+        "samplers": [
+            ("NormalTextureSampler", 'E7_A5_A4_93.dds'),
+            ("DiffuseTextureSampler", None),
+        ],
+        "alpha_samplers": ["DiffuseTextureSampler"],
+        "properties": [
+            ("LightMultipliers", [3.0, 1.0, 0.0, 0.0]),
+            ("MaterialShadowMapBias", [0.0010000000474974513, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [0.013000000268220901, 0.30000001192092896, 3.0, 0.0]),
+            ("mSpecularControls", [0.5, 1.0, 60.0, 1.0]),
+            ("materialDiffuse", [0.0, 0.0, 0.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Glass',
+        "name": "Glass",
+        "label": "Glass",
+        "description": "Material for glass",
+        "shader_type": "Vehicle_Glass_Emissive_Coloured",
+        "samplers": [
+            ("EmissiveTextureSampler", '89_20_8C_6D.dds'),
+            ("CrackedGlassTextureSampler", 'BE_12_78_F1.dds'),
+            ("CrackedGlassNormalTextureSampler", '52_5D_C3_15.dds'),
+        ],
+        "properties": [
+            ("BrakeColour", [0.25, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("ReversingColour", [1.0, 1.0, 1.0, 1.0]),
+            ("RunningColour", [0.07035999745130539, 0.07035999745130539, 0.07035999745130539, 1.0]),
+            ("UnusedColour", [0.0, 0.0, 0.0, 1.0]),
+            ("mCrackedGlassSpecularColour", [0.19599999487400055, 0.6549999713897705, 0.7879999876022339, 1.0]),
+            ("mCrackedGlassSpecularControls", [0.10999999940395355, 3.5, 1.0, 0.0]),
+            ("mGlassColour", [0.0, 0.0, 0.0, 1.0]),
+            ("mGlassControls", [0.03999999910593033, 1.0, 3.0, 0.9900000095367432]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Glass_Red',
+        "name": "GlassRed",
+        "label": "GlassRed (Taillight Glass)",
+        "description": "Material for taillight glass (Red)",
+        "shader_type": "Vehicle_Glass_Emissive_Coloured",
+        "samplers": [
+            ("EmissiveTextureSampler", '89_20_8C_6D.dds'),
+            ("CrackedGlassTextureSampler", 'BE_12_78_F1.dds'),
+            ("CrackedGlassNormalTextureSampler", '52_5D_C3_15.dds'),
+        ],
+        "properties": [
+            ("BrakeColour", [0.25, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("ReversingColour", [1.0, 1.0, 1.0, 1.0]),
+            ("RunningColour", [0.0822829976677895, 0.00367700005881488, 0.00439100014045835, 1.0]),
+            ("UnusedColour", [0.0, 0.0, 0.0, 1.0]),
+            ("mCrackedGlassSpecularColour", [0.19599999487400055, 0.6549999713897705, 0.7879999876022339, 1.0]),
+            ("mCrackedGlassSpecularControls", [0.10999999940395355, 3.5, 1.0, 0.0]),
+            ("mGlassColour", [1.0, 0.0, 0.0, 1.0]),
+            ("mGlassControls", [0.0149999996647239, 0.600000023841858, 3.0, 0.800000011920929]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Glass_Livery',
+        "name": "GlassLivery",
+        "prefix": "GlassRed",
+        "label": "GlassLivery",
+        "description": "Material for glass that supports wrap editing",
+        "shader_type": "Vehicle_Glass_Emissive_Coloured_Singlesided_Wrap",
+        "samplers": [
+            ("EmissiveTextureSampler", '89_20_8C_6D.dds'),
+            ("CrackedGlassTextureSampler", 'BE_12_78_F1.dds'),
+            ("CrackedGlassNormalTextureSampler", '52_5D_C3_15.dds'),
+        ],
+        "properties": [
+            ("BrakeColour", [0.25, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("ReversingColour", [1.0, 1.0, 1.0, 1.0]),
+            ("RunningColour", [0.07035999745130539, 0.07035999745130539, 0.07035999745130539, 1.0]),
+            ("UnusedColour", [0.0, 0.0, 0.0, 1.0]),
+            ("mCrackedGlassSpecularColour", [0.19599999487400055, 0.6549999713897705, 0.7879999876022339, 1.0]),
+            ("mCrackedGlassSpecularControls", [0.10999999940395355, 3.5, 1.0, 0.0]),
+            ("mGlassColour", [0.0, 0.0, 0.0, 1.0]),
+            ("mGlassControls", [0.03999999910593033, 1.0, 3.0, 0.9900000095367432]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Glass_Surround',
+        "name": "GlassSurround",
+        "label": "GlassSurround",
+        "description": "Material for glass that surrounds the windshield, livery is supported",
+        "shader_type": "Vehicle_Glass_Emissive_Coloured_Singlesided_Wrap",
+        "samplers": [
+            ("EmissiveTextureSampler", '89_20_8C_6D.dds'),
+            ("CrackedGlassTextureSampler", 'BE_12_78_F1.dds'),
+            ("CrackedGlassNormalTextureSampler", '52_5D_C3_15.dds'),
+        ],
+        "properties": [
+            ("BrakeColour", [0.25, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("ReversingColour", [1.0, 1.0, 1.0, 1.0]),
+            ("RunningColour", [0.07035999745130539, 0.07035999745130539, 0.07035999745130539, 1.0]),
+            ("UnusedColour", [0.0, 0.0, 0.0, 1.0]),
+            ("mCrackedGlassSpecularColour", [0.19599999487400055, 0.6549999713897705, 0.7879999876022339, 1.0]),
+            ("mCrackedGlassSpecularControls", [0.10999999940395355, 3.5, 1.0, 0.0]),
+            ("mGlassColour", [0.0, 0.0, 0.0, 1.0]),
+            ("mGlassControls", [0.03999999910593033, 1.0, 3.5, 0.7400000095367432]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Grille',
+        "name": "Grille",
+        "label": "Grille",
+        "description": "Material for grille, which supports transparency",
+        "shader_type": "Vehicle_1Bit_Textured_NormalMapped_Emissive_AO_Livery",
+        "samplers": [
+            ("NormalTextureSampler", 'E7_A5_A4_93.dds'),
+            ("DiffuseTextureSampler", None),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "alpha_samplers": ["DiffuseTextureSampler"],
+        "properties": [
+            ("LightMultipliers", [60.0, 0.0, 0.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [0.0, 0.0, 0.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mScratchSpecularControls", [0.009999999776482582, 0.15000000596046448, 5.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [0.0010000000474974513, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.04, 0.7, 35.0, 0.0]),
+            ("materialDiffuse", [0.0, 0.0, 0.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Interior',
+        "name": "Interior",
+        "label": "Interior",
+        "description": "Material for interior that doesn't support emissive nor transparency",
+        "shader_type": "Vehicle_Opaque_Textured_Phong",
+        "samplers": [
+            ("DiffuseTextureSampler", None),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 1.0, 1.0]),
+            ("MaterialShadowMapBias", [1.0, 0.699999988079071, 0.0, 0.0]),
+            ("mSpecularControls", [0.0500000007450581, 0.850000023841858, 2.0, 1.0]),
+            ("materialDiffuse", [0.00150000001303852, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Interior_Emissive',
+        "name": "InteriorEmissive",
+        "label": "InteriorEmissive",
+        "description": "Material for emissives part in interior",
+        "shader_type": "Vehicle_Opaque_Textured_NormalMapped_Emissive_AO",
+        "samplers": [
+            ("NormalTextureSampler", 'E7_A5_A4_93.dds'),
+            ("DiffuseTextureSampler", None),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 0.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 0.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Lights',
+        "name": "Lights",
+        "label": "Lights",
+        "description": "Material for lights",
+        "shader_type": "Vehicle_Opaque_Textured_NormalMapped_Reflective_Emissive_AO",
+        "samplers": [
+            ("NormalTextureSampler", 'E7_A5_A4_93.dds'),
+            ("DiffuseTextureSampler", None),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 0.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [0.0099999997764825820, 0.5, 3.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 0.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Metal_Chrome',
+        "name": "MetalChrome",
+        "label": "MetalChrome",
+        "description": "Material for metallic chrome",
+        "shader_type": "Vehicle_Opaque_Emissive_Reflective_AO",
+        "samplers": [
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 0.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [0.0099999997764825820, 0.8500000238, 0.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 0.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Metal_Colorable',
+        "name": "MetalColorable",
+        "label": "MetalColorable",
+        "description": "Material for vehicle paint which supports livery editing",
+        "shader_type": "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_Wrap",
+        "samplers": [
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("CrumpleTextureSampler", '11_BF_74_F7.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mPaintColourIndex", [0.0, 0.0, 0.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Metal_Half_Livery',
+        "name": "MetalHalfLivery",
+        "label": "MetalHalfLivery",
+        "description": "Material that supports vehicle wrap, transparency area would be paint colour",
+        "shader_type": "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_Livery",
+        "samplers": [
+            ("DiffuseTextureSampler", None),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("CrumpleTextureSampler", '11_BF_74_F7.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mPaintColourIndex", [0.0, 0.0, 0.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Metal_Livery_Carbon',
+        "name": "MetalLiveryCarbon",
+        "label": "MetalLiveryCarbon",
+        "description": "Material for carbon fiber",
+        "shader_type": "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_ColourOverride_Livery",
+        "samplers": [
+            ("DiffuseTextureSampler", '90_73_F3_CE.dds'),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("CrumpleTextureSampler", '11_BF_74_F7.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 0.699999988079071, 1.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mDiffuseFresnel", [1.5, 0.0, 4.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mEnvSpecularControls", [0.44999998807907104, 0.20000000298023224, 0.0, 0.0]),
+            ("mPearlescentPower", [20.0, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [0.019999999552965164, 0.4000000059604645, 12.0, 0.0]),
+            ("mScratchSpecularControls", [0.4000000059604645, 0.15000000596046448, 50.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [3.0, 0.4000000059604645, 35.0, 0.9800000190734863]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+            ("pearlescentColour", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Metal_Livery_Gloss',
+        "name": "MetalLiveryGloss",
+        "label": "MetalLiveryGloss",
+        "description": "Material for glossy looking diffuse",
+        "shader_type": "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_ColourOverride_Livery",
+        "samplers": [
+            ("DiffuseTextureSampler", None),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("CrumpleTextureSampler", '11_BF_74_F7.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 0.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mDiffuseFresnel", [1.0, 0.75, 5.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mEnvSpecularControls", [1.0, 0.20000000298023224, 0.0, 0.0]),
+            ("mPearlescentPower", [4.0, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [0.0099999997764825820, 0.600000023841858, 5.0, 0.0]),
+            ("mScratchSpecularControls", [0.25, 0.25, 20.0, 0.20000000298023224]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 1.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+            ("pearlescentColour", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Metal_Livery_Matte',
+        "name": "MetalLiveryMatte",
+        "label": "MetalLiveryMatte",
+        "description": "Material for matte looking diffuse",
+        "shader_type": "Vehicle_Opaque_PaintGloss_Textured_LightmappedLights_ColourOverride_Livery",
+        "samplers": [
+            ("DiffuseTextureSampler", None),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("CrumpleTextureSampler", '11_BF_74_F7.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 0.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mDiffuseFresnel", [1.0, 0.75, 5.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mEnvSpecularControls", [1.0, 0.20000000298023224, 0.0, 1.0]),
+            ("mPearlescentPower", [4.0, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [0.0, 0.0, 5.0, 0.0]),
+            ("mScratchSpecularControls", [0.25, 0.25, 20.0, 0.20000000298023224]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.100000001490116, 0.10000000149011612, 4.0, 1.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+            ("pearlescentColour", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Metal_Secondary_Coloured_Livery',
+        "name": "MetalSecondaryColouredLivery",
+        "label": "MetalSecondaryColouredLivery",
+        "description": "Material for vehicle paint that has secondary colour setting",
+        "shader_type": "Vehicle_Opaque_Two_PaintGloss_Textured_LightmappedLights_Livery_Wrap",
+        "samplers": [
+            ("DiffuseTextureSampler", None),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("CrumpleTextureSampler", '11_BF_74_F7.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Opaque_DULL',
+        "name": "OpaqueDULL",
+        "label": "OpaqueDULL",
+        "description": "Material for dull looking diffuse",
+        "shader_type": "Vehicle_Opaque_Textured",
+        "samplers": [
+            ("DiffuseTextureSampler", None),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 0.0, 0.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 1.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Plastic_Black',
+        "name": "PlasticBlack",
+        "label": "PlasticBlack",
+        "description": "Material for pure black",
+        "shader_type": "Vehicle_Opaque_Textured_Phong",
+        "samplers": [
+            ("DiffuseTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 1.0, 1.0]),
+            ("MaterialShadowMapBias", [1.0, 0.699999988079071, 0.0, 0.0]),
+            ("mSpecularControls", [0.0500000007450581, 0.850000023841858, 2.0, 1.0]),
+            ("materialDiffuse", [0.00150000001303852, 0.0, 0.0, 0.0]),
+        ],
+    },
+    {
+        "key": 'Mirror',
+        "name": "Mirror",
+        "label": "Mirror",
+        "description": "Material for mirrors",
+        "shader_type": "Vehicle_Opaque_Reflective",
+        "samplers": [
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 0.0, 0.0]),
+            ("MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [1.0, 0.5, 3.0, 0.0]),
+            ("mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 1.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Plate_Racer',
+        "name": "PlateRacer",
+        "label": "PlateRacer",
+        "description": "Material for racer variant license plate",
+        "shader_type": "Vehicle_Opaque_Textured_NormalMapped_Reflective_Emissive_AO_Livery",
+        "samplers": [
+            ("NormalTextureSampler", '19_97_AA_7C.dds'),
+            ("DiffuseTextureSampler", '10_C3_82_CD.dds'),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", 'E7_A5_A4_93.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 1.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [0.0010000000474974513, 0.0, 0.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [0.009999999776482582, 0.009999999776482582, 3.0, 0.0]),
+            ("mScratchSpecularControls", [0.25, 0.25, 50.0, 0.10000000149011612]),
+            ("mSelfIlluminationMultiplier", [0.4, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.04, 0.7, 35.0, 0.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Plate_Cop',
+        "name": "PlateCop",
+        "label": "PlateCop",
+        "description": "Material for cop variant license plate",
+        "shader_type": "Vehicle_Opaque_Textured_NormalMapped_Reflective_Emissive_AO_Livery",
+        "samplers": [
+            ("NormalTextureSampler", 'F9_E1_60_01.dds'),
+            ("DiffuseTextureSampler", '75_C5_BD_C5.dds'),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", 'E7_A5_A4_93.dds'),
+        ],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 1.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [0.0010000000474974513, 0.0, 0.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mReflectionControls", [0.009999999776482582, 0.009999999776482582, 3.0, 0.0]),
+            ("mScratchSpecularControls", [0.25, 0.25, 50.0, 0.10000000149011612]),
+            ("mSelfIlluminationMultiplier", [0.4, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.04, 0.7, 35.0, 0.0]),
+            ("materialDiffuse", [1.0, 1.0, 1.0, 1.0]),
+        ],
+    },
+    {
+        "key": 'Interior_Badge',
+        "name": "InteriorBadge",
+        "label": "InteriorBadge",
+        "description": "Material for interior badging for more details",
+        "shader_type": "Vehicle_1Bit_Textured_NormalMapped_Emissive_AO_Livery",
+        "samplers": [
+            ("NormalTextureSampler", 'E7_A5_A4_93.dds'),
+            ("DiffuseTextureSampler", None),
+            ("AoMapTextureSampler", '13_94_2A_CA.dds'),
+            ("ScratchTextureSampler", '85_68_7E_F0.dds'),
+            ("LightmapLightsTextureSampler", '89_20_8C_6D.dds'),
+        ],
+        "alpha_samplers": ["DiffuseTextureSampler"],
+        "properties": [
+            ("LightMultipliers", [1.0, 1.0, 0.0, 0.0]),
+            ("LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0]),
+            ("LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0]),
+            ("MaterialShadowMapBias", [0.0, 0.0, 0.0, 0.0]),
+            ("mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0]),
+            ("mScratchSpecularControls", [0.009999999776482582, 0.15000000596046448, 5.0, 0.0]),
+            ("mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0]),
+            ("mSpecularControls", [0.05, 0.5, 25.0, 0.0]),
+            ("materialDiffuse", [0.016807, 0.016807, 0.016807, 1.0]),
+        ],
+    },
+]
+
+MaterialTemplate = namedtuple("MaterialTemplate", ("key", "name", "prefix", "shader_type", "samplers", "properties", "alpha_samplers", "fingerprint"))
+
+#Template key -> MaterialTemplate
+material_templates = {}
+
+def compile_material_templates():
+
+    material_templates.clear()
+    template_default_textures.clear()
+
+    for entry in material_template_table:
+        prefix = entry.get("prefix", entry["name"]) + "_"
+        samplers = tuple((node_name, image_name or 'null') for node_name, image_name in entry["samplers"])
+        properties = tuple((name, tuple(values)) for name, values in entry["properties"])
+        parameter_hash = hashlib.sha1(repr((prefix, entry["shader_type"], samplers, properties)).encode()).hexdigest()[:12]
+
+        material_templates[entry["key"]] = MaterialTemplate(
+            key = entry["key"],
+            name = entry["name"],
+            prefix = prefix,
+            shader_type = entry["shader_type"],
+            samplers = samplers,
+            properties = properties,
+            alpha_samplers = frozenset(entry.get("alpha_samplers", ())),
+            fingerprint = entry["key"] + ":" + str(material_template_version) + ":" + parameter_hash,
+        )
+        template_default_textures.update(image_name for _, image_name in entry["samplers"] if image_name)
+
+    return 0
+
+def get_template_prototype(template, prototypes):
+
+    #Samplers with their default images resolved once per batch. The images are not kept after the batch
+    #since they can be removed (Outliner, Clean Up, undo) without the add-on knowing
+    prototype = prototypes.get(template.key)
+
+    if prototype is None:
+        prototype = tuple((node_name, image_name, None if image_name == 'null' else get_default_image(image_name))
+                          for node_name, image_name in template.samplers)
+        prototypes[template.key] = prototype
+
+    return prototype
+
+#Status of apply_material_template() for a material that already matches the template
+template_up_to_date = 1
+
+def apply_material_template(mat, template, update = False, prototypes = None):
+
+    status = 0
+    prototypes = {} if prototypes is None else prototypes
+
+    if mat:
+        #Materials set up before only get what differs from the template
+        if update and "shader_type" in mat:
+            if mat.get("hpr_template") == template.fingerprint:
+                return template_up_to_date, template.name
+            status += update_material_template(mat, template, prototypes)
+            return status, template.name
+
+        mat["shader_type"] = template.shader_type
+        mat.name = template.prefix + mat.name
+
+        for node_name, image_name, image in get_template_prototype(template, prototypes):
+            status += createImageNode(mat, node_name, image_name, image)
+
+        for name, values in template.properties:
+            status += createMaterialCustomProperty(mat, name, list(values))
+
+        mat["hpr_template"] = template.fingerprint
+
+    return status, template.name
+
+def material_property_values(mat, name):
+
+    #Values of a float4 property as a tuple, None for anything else
+    value = mat.get(name)
+
+    if not hasattr(value, "__len__") or isinstance(value, str) or len(value) != 4:
+        return None
+
+    return tuple(value)
+
+def update_material_template(mat, template, prototypes):
 
     status = 0
+    previous = material_templates.get(str(mat.get("hpr_template", "")).partition(":")[0])
+
+    #Swap the name prefix of the previous template for the new one. Materials from before fingerprints
+    #don't say which template they had, so any template prefix is taken, longest first
+    prefixes = [previous.prefix] if previous else sorted({other.prefix for other in material_templates.values()}, key = len, reverse = True)
+
+    base_name = mat.name
+    for prefix in prefixes + [template.prefix]:
+        if base_name.startswith(prefix):
+            base_name = base_name[len(prefix):]
+            break
+
+    if mat.name != template.prefix + base_name:
+        mat.name = template.prefix + base_name
+
+    if mat["shader_type"] != template.shader_type:
+        mat["shader_type"] = template.shader_type
+
+    #Reuse sampler nodes by name, only setting images that differ
+    nodes = mat.node_tree.nodes
+
+    for node_name, image_name, image in get_template_prototype(template, prototypes):
+        node = nodes.get(node_name)
+
+        if node is None or node.type != 'TEX_IMAGE':
+            status += createImageNode(mat, node_name, image_name, image)
+        elif image_name != 'null' and (node.image is None or (node.image.name != image_name and is_default_texture(node.image))):
+            #Images the user picked instead of a default are kept
+            image = image or get_default_image(image_name)
+            if image:
+                node.image = image
+            else:
+                print("Unable to find image " + image_name + " for " + node_name)
+                status -= 1
+
+    for name, values in template.properties:
+        if name in mat and material_property_values(mat, name) != values:
+            del mat[name]
+
+        if name not in mat:
+            status += createMaterialCustomProperty(mat, name, list(values))
+
+    #Drop what only the previous template used, unless the user changed it since
+    if previous:
+        sampler_names = {node_name for node_name, image_name in template.samplers}
+        property_names = {name for name, values in template.properties}
+
+        for node_name, image_name in previous.samplers:
+            node = nodes.get(node_name)
+            if node_name in sampler_names or node is None or node.type != 'TEX_IMAGE':
+                continue
+            if node.image is None or node.image.name == image_name:
+                nodes.remove(node)
+
+        for name, values in previous.properties:
+            if name not in property_names and material_property_values(mat, name) == values:
+                del mat[name]
+
+    mat["hpr_template"] = template.fingerprint
+
+    return status
+
+def selected_materials():
+
+    materials = []
+    seen = set()
+    skipped = 0
+
+    #Materials shared between objects or slots are only listed once
+    for obj in only_selected_mesh():
+        for slot in obj.material_slots:
+            mat = slot.material
+
+            if mat is None:
+                skipped += 1
+            elif mat not in seen:
+                seen.add(mat)
+                materials.append(mat)
+
+    return materials, skipped
+
+def snapshot_material(mat):
+
+    properties = {}
+    for name in mat.keys():
+        value = mat[name]
+        properties[name] = value.to_list() if hasattr(value, "to_list") else value
+
+    #Sampler nodes are kept whole, updating a template may remove them
+    nodes = {}
+    if mat.node_tree:
+        nodes = {node.name: (node.type, node.image if node.type == 'TEX_IMAGE' else None, tuple(node.location))
+                 for node in mat.node_tree.nodes}
+
+    return mat.name, mat.use_nodes, properties, nodes
+
+def restore_material(mat, snapshot):
+
+    name, use_nodes, properties, nodes = snapshot
+
+    for key in list(mat.keys()):
+        if key not in properties:
+            del mat[key]
+
+    for key, value in properties.items():
+        current = mat.get(key)
+
+        if current is None:
+            createMaterialCustomProperty(mat, key, value)
+        elif (current.to_list() if hasattr(current, "to_list") else current) != value:
+            mat[key] = value
+
+    if mat.node_tree:
+        tree_nodes = mat.node_tree.nodes
+
+        for node in list(tree_nodes):
+            if node.name not in nodes:
+                tree_nodes.remove(node)
+            elif node.type == 'TEX_IMAGE' and node.image != nodes[node.name][1]:
+                node.image = nodes[node.name][1]
+
+        for node_name, (node_type, image, location) in nodes.items():
+            if node_type == 'TEX_IMAGE' and node_name not in tree_nodes:
+                node = tree_nodes.new(type = 'ShaderNodeTexImage')
+                node.name = node_name
+                node.location = location
+                node.image = image
+
+    mat.use_nodes = use_nodes
+    mat.name = name
+
+class MaterialTemplateJob:
+
+    #Template application over the selected materials, one item per material
+    def __init__(self, template, update = False, keep_rollback = False):
+        self.template = template
+        self.update = update
+        self.items, self.skipped = selected_materials()
+        self.keep_rollback = keep_rollback
+        self.prototypes = {}
+        self.done = []
+        self.processed = 0
+        self.failed = 0
+
+    def process(self, mat):
+        #Materials linked from another file can't be edited
+        if mat.library:
+            print("Skipping " + mat.name + " as it is linked from " + mat.library.filepath)
+            self.skipped += 1
+            return 0
+
+        if self.keep_rollback:
+            self.done.append((mat, snapshot_material(mat)))
+
+        if not mat.use_nodes:
+            mat.use_nodes = True
+
+        status, description = apply_material_template(mat, self.template, self.update, self.prototypes)
+
+        if status == template_up_to_date:
+            self.skipped += 1
+            return 0
+
+        if status == 0:
+            self.processed += 1
+        else:
+            self.failed += 1
+
+        return status
+
+    def finish(self):
+        self.prototypes.clear()
+
+    def rollback(self):
+        self.prototypes.clear()
+        for mat, snapshot in reversed(self.done):
+            restore_material(mat, snapshot)
+        self.done.clear()
+
+def apply_material_template_batch(template, update = False):
+
+    job = MaterialTemplateJob(template, update)
+
+    for mat in job.items:
+        job.process(mat)
+
+    job.finish()
+
+    return job.processed, job.skipped, job.failed
+
+#Material name pattern -> template key, first matching rule wins
+default_material_rules = [
+    (r"interior.*badge|badge.*interior", 'Interior_Badge'),
+    (r"badge|emblem|logo", 'Badge'),
+    (r"tail.*glass|glass.*(tail|red)|brake.*glass", 'Glass_Red'),
+    (r"windshield|windscreen|window|side_?glass", 'Glass_Livery'),
+    (r"glass.*surround|surround.*glass", 'Glass_Surround'),
+    (r"glass|lens", 'Glass'),
+    (r"grill", 'Grille'),
+    (r"dash|gauge|cluster", 'Interior_Emissive'),
+    (r"interior|seat|cabin|steering|carpet", 'Interior'),
+    (r"light|lamp|indicator|blinker", 'Lights'),
+    (r"chrome|exhaust", 'Metal_Chrome'),
+    (r"carbon", 'Metal_Livery_Carbon'),
+    (r"matte", 'Metal_Livery_Matte'),
+    (r"mirror", 'Mirror'),
+    (r"plate|licen[cs]e", 'Plate_Racer'),
+    (r"black|plastic|trim|rubber", 'Plastic_Black'),
+    (r"under|chassis|dull", 'Opaque_DULL'),
+    (r"body|paint", 'Metal_Colorable'),
+]
+
+#Rules file path (or "" for the defaults) -> (modified time, compiled matcher, group name -> template key)
+material_rule_cache = {}
+
+def load_material_rules(filepath):
+
+    if not filepath:
+        return default_material_rules
+
+    #Expected layout: {"rules": [{"pattern": "...", "template": "Badge"}, ...]}
+    with open(bpy.path.abspath(filepath), encoding = 'utf-8') as file:
+        return [(rule["pattern"], rule["template"]) for rule in json.load(file)["rules"]]
+
+#Global inline flags like (?i) and numbered backreferences like \1 break once the rules are joined into one pattern
+rule_inline_flags = re.compile(r"\(\?[aiLmsux]+\)")
+rule_backreference = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]")
+
+def check_material_rule(pattern):
+
+    if rule_inline_flags.search(pattern):
+        raise ValueError("Inline flags are not supported in rule " + pattern + ", rules already ignore case and scoped flags like (?i:...) can be used instead")
+
+    if rule_backreference.search(pattern):
+        raise ValueError("Numbered backreferences are not supported in rule " + pattern + ", use a named group and (?P=name) instead")
+
+    try:
+        re.compile(pattern)
+    except re.error as error:
+        raise ValueError("Invalid pattern in rule " + pattern + ": " + str(error))
+
+def compile_material_rules(filepath = ""):
+
+    modified = os.path.getmtime(bpy.path.abspath(filepath)) if filepath else 0
+    cached = material_rule_cache.get(filepath)
+
+    if cached and cached[0] == modified:
+        return cached[1], cached[2]
+
+    alternatives = []
+    rule_templates = {}
+
+    rules = load_material_rules(filepath)
+
+    for index, (pattern, key) in enumerate(rules):
+        if key not in material_templates:
+            raise ValueError("Unknown material template " + key + " in rule " + pattern)
+
+        check_material_rule(pattern)
+        alternatives.append(f"(?P<rule{index}>.*?(?:{pattern}))")
+        rule_templates[f"rule{index}"] = key
+
+    #Alternatives are tried in order from the start of the name, so rule order is priority order
+    try:
+        matcher = re.compile("|".join(alternatives), re.IGNORECASE)
+    except re.error as error:
+        #Some patterns only fail next to the others, e.g. a group name used by two rules. Adding
+        #the rules back one at a time finds the first one that breaks the combined pattern
+        for count in range(1, len(alternatives) + 1):
+            try:
+                re.compile("|".join(alternatives[:count]), re.IGNORECASE)
+            except re.error:
+                raise ValueError("Rule " + rules[count - 1][0] + " can't be combined with the rules before it: " + str(error))
+        raise
+    material_rule_cache[filepath] = (modified, matcher, rule_templates)
+
+    return matcher, rule_templates
+
+def classify_materials(materials, filepath = ""):
+
+    matcher, rule_templates = compile_material_rules(filepath)
+    matches = []
+
+    for mat in materials:
+        match = matcher.match(mat.name)
+        matches.append((mat, rule_templates[match.lastgroup] if match else None))
+
+    return matches
+
+def auto_assign_material_templates(filepath = "", dry_run = True):
+
+    materials, skipped = selected_materials()
+    matches = classify_materials(materials, filepath)
+    processed = 0
+    failed = 0
+    prototypes = {}
+
+    print(f"{'Material':<48}{'Template':<36}")
+    for mat, key in matches:
+        if key is None:
+            result = "-"
+        elif "shader_type" in mat:
+            result = "(already has " + mat["shader_type"] + ")"
+        else:
+            result = material_templates[key].name
+        print(f"{mat.name:<48}{result:<36}")
+
+    for mat, key in matches:
+        #Unmatched materials and ones already set up are left alone
+        if key is None or "shader_type" in mat or mat.library:
+            skipped += 1
+            continue
+
+        if dry_run:
+            processed += 1
+            continue
+
+        if not mat.use_nodes:
+            mat.use_nodes = True
+
+        status, description = apply_material_template(mat, material_templates[key], prototypes = prototypes)
+
+        if status == 0:
+            processed += 1
+        else:
+            failed += 1
+
+    return processed, skipped, failed
+
+#Rule -> heading of the validation report, in the order it is printed
+validation_rules = {
+    "collection": "Objects outside the vehicle sub-collections",
+    "parent": "Unparented meshes",
+    "material_slot": "Empty material slots",
+    "shader_type": "Materials without a template",
+    "sampler": "Samplers without an image",
+    "property": "Custom properties that are not float4",
+}
+
+#Material custom properties written by the add-on that aren't shader parameters
+material_metadata_properties = {'shader_type', 'hpr_template'}
+
+VehicleIndex = namedtuple("VehicleIndex", ["collection", "graphics", "objects", "materials", "nodes", "images"])
+
+def vehicle_collections(car_id = ""):
+
+    #Every vehicle in the file when no ID is given
+    if car_id:
+        collection = bpy.data.collections.get("VEH_" + car_id + "_MS")
+        return [collection] if collection else []
+
+    return [collection for collection in bpy.data.collections
+            if collection.name.startswith("VEH_") and collection.name.endswith("_MS")]
+
+def vehicle_graphics_collection(vehicle_collection):
+
+    car_id = vehicle_collection.name[len("VEH_"):-len("_MS")]
+    return bpy.data.collections.get(car_id + "_Graphics")
+
+def index_vehicle(vehicle_collection):
+
+    objects = {}
+    materials = {}
+    nodes = {}
+    images = {}
+
+    #Object -> vehicle collections it is linked to, from a single walk of the tree
+    for collection in [vehicle_collection] + list(vehicle_collection.children_recursive):
+        for obj in collection.objects:
+            objects.setdefault(obj, []).append(collection)
+
+    for obj in objects:
+        for slot in obj.material_slots:
+            if slot.material:
+                materials.setdefault(slot.material, []).append(obj)
+
+    for mat in materials:
+        nodes[mat] = [node for node in mat.node_tree.nodes if node.type == 'TEX_IMAGE'] if mat.node_tree else []
+
+        for node in nodes[mat]:
+            if node.image:
+                images.setdefault(node.image, []).append((mat, node))
+
+    return VehicleIndex(vehicle_collection, vehicle_graphics_collection(vehicle_collection), objects, materials, nodes, images)
+
+def validate_object(obj, collections, vehicle_collection, graphics_collection):
+
+    problems = []
+
+    if all(collection == vehicle_collection for collection in collections):
+        problems.append(("collection", obj.name + " is directly in " + vehicle_collection.name))
+
+    if obj.type != 'MESH':
+        return problems
+
+    if graphics_collection in collections and (obj.parent is None or obj.parent.type != 'EMPTY'):
+        problems.append(("parent", obj.name + " has no Empty parent"))
+
+    if not obj.material_slots:
+        problems.append(("material_slot", obj.name + " has no materials"))
+
+    for index, slot in enumerate(obj.material_slots):
+        if slot.material is None:
+            problems.append(("material_slot", obj.name + " slot " + str(index) + " is empty"))
+
+    return problems
+
+def validate_loose_object(obj):
+
+    #Meshes of the scene that no vehicle collection holds are never exported
+    if obj.type == 'MESH' and bpy.context.scene in obj.users_scene:
+        return [("collection", obj.name + " is not in any VEH_<id>_MS sub-collection")]
+
+    return []
+
+def loose_meshes(vehicle_collection_names):
+
+    return [obj for obj in bpy.context.scene.collection.all_objects
+            if obj.type == 'MESH' and not any(collection.name in vehicle_collection_names for collection in obj.users_collection)]
+
+def validate_material(mat, image_nodes):
+
+    problems = []
+
+    if "shader_type" not in mat:
+        problems.append(("shader_type", mat.name))
+
+    for node in image_nodes:
+        if node.image is None:
+            problems.append(("sampler", mat.name + " > " + node.name))
+
+    for name in mat.keys():
+        if name in material_metadata_properties or name.startswith("_") or name == "cycles":
+            continue
+
+        value = mat[name]
+        if not hasattr(value, "__len__") or isinstance(value, str) or len(value) != 4 \
+                or not all(isinstance(item, float) for item in value):
+            problems.append(("property", mat.name + " > " + name + " = " + repr(value.to_list() if hasattr(value, "to_list") else value)))
+
+    return problems
+
+def validate_vehicle(car_id = ""):
+
+    report = {rule: [] for rule in validation_rules}
+    collections = vehicle_collections(car_id)
+
+    if not collections:
+        print("No vehicle collection found, run Prepare Collection first.")
+        return None
+
+    for vehicle_collection in collections:
+        index = index_vehicle(vehicle_collection)
+        trace_count("objects_validated", len(index.objects))
+        trace_count("materials_validated", len(index.materials))
+
+        for obj, obj_collections in index.objects.items():
+            for rule, message in validate_object(obj, obj_collections, index.collection, index.graphics):
+                report[rule].append(message)
+
+        for mat in index.materials:
+            for rule, message in validate_material(mat, index.nodes[mat]):
+                report[rule].append(message)
+
+    #A mesh in any vehicle is fine, even when only one vehicle is validated
+    vehicle_collection_names = {collection.name for vehicle_collection in vehicle_collections()
+                                for collection in [vehicle_collection] + list(vehicle_collection.children_recursive)}
+
+    for obj in loose_meshes(vehicle_collection_names):
+        for rule, message in validate_loose_object(obj):
+            report[rule].append(message)
+
+    return report
+
+def print_validation_report(report):
+
+    problems = sum(len(messages) for messages in report.values())
+
+    for rule, messages in report.items():
+        if messages:
+            print(validation_rules[rule] + " (" + str(len(messages)) + "):")
+            for message in messages:
+                print("    " + message)
+
+    print("Validation found " + str(problems) + " problems.")
+
+    return problems
+
+#(filepath, size, modified time) -> sha256 of the file, so repeated runs only hash files that changed
+image_hash_cache = {}
+
+def image_file_size(image):
+
+    if image.packed_file:
+        return image.packed_file.size
+
+    if image.source != 'FILE':
+        return None
+
+    filepath = bpy.path.abspath(image.filepath)
+    return os.path.getsize(filepath) if os.path.isfile(filepath) else None
+
+def hash_image(image):
+
+    if image.packed_file:
+        return hashlib.sha256(image.packed_file.data).hexdigest()
+
+    filepath = os.path.normpath(bpy.path.abspath(image.filepath))
+    stat = os.stat(filepath)
+    key = (filepath, stat.st_size, stat.st_mtime_ns)
+
+    if key in image_hash_cache:
+        return image_hash_cache[key]
+
+    #Default textures already have their hash in the manifest
+    entry = texture_manifest.get(os.path.basename(filepath))
+    if entry and entry["size"] == stat.st_size and os.path.dirname(filepath) == os.path.normpath(default_texture_directory()):
+        content_hash = entry["sha256"]
+    else:
+        hasher = hashlib.sha256()
+        with open(filepath, 'rb') as file:
+            while True:
+                chunk = file.read(1 << 20)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+        content_hash = hasher.hexdigest()
+        trace_count("images_hashed")
+
+    image_hash_cache[key] = content_hash
+
+    return content_hash
+
+def vehicle_image_users(car_id = ""):
+
+    #Image -> image nodes of the vehicle materials using it
+    users = {}
+
+    for vehicle_collection in vehicle_collections(car_id):
+        for image, nodes in index_vehicle(vehicle_collection).images.items():
+            users.setdefault(image, []).extend(node for mat, node in nodes)
+
+    return users
+
+def deduplicate_images(car_id = "", dry_run = False):
+
+    if not vehicle_collections(car_id):
+        print("No vehicle collection found, run Prepare Collection first.")
+        return None
+
+    users = vehicle_image_users(car_id)
+
+    #Default textures are only ever kept, equal files among them are still different resources in game.
+    #Images linked from another file can't be removed here
+    images = {image for image in users if image.library is None and not is_default_texture(image)}
+    defaults = {image for image in bpy.data.images if is_default_texture(image)}
+
+    #Only files of the same size can be equal, so most images are never read
+    candidates = {}
+
+    for image in images | defaults:
+        size = image_file_size(image)
+        if size is not None:
+            key = (size, image.colorspace_settings.name, image.alpha_mode)
+            candidates.setdefault(key, []).append(image)
+
+    duplicates = {}
+
+    for key, group in candidates.items():
+        if len(group) < 2 or not any(image in images for image in group):
+            continue
+
+        for image in group:
+            duplicates.setdefault(key + (hash_image(image),), []).append(image)
+
+    merged = []
+    removed = []
+    saved_file_bytes = 0
+    saved_memory_bytes = 0
+
+    for key, group in duplicates.items():
+        vehicle_group = sorted((image for image in group if image in images), key = lambda image: image.name)
+        default_group = [image for image in group if image in defaults]
+
+        #Onto the default texture with the same content, unless several defaults match
+        if len(default_group) == 1:
+            keeper = default_group[0]
+        elif len(vehicle_group) > 1:
+            keeper = vehicle_group.pop(0)
+        else:
+            continue
+
+        for image in vehicle_group:
+            print(f"{image.name:<48}-> {keeper.name}")
+            merged.append(image)
+
+            #Images also used outside of the vehicle stay for those users
+            if image.users - image.use_fake_user == len(users[image]):
+                saved_file_bytes += key[0]
+                saved_memory_bytes += estimate_datablock_size(image)
+                removed.append(image)
+
+            if not dry_run:
+                for node in users[image]:
+                    node.image = keeper
+
+    if removed and not dry_run:
+        bpy.data.batch_remove(removed)
+
+    trace_count("images_merged", len(merged))
+    print(f"Merged {len(merged)} duplicate images, removing {len(removed)} and saving {saved_file_bytes / (1024 * 1024):.1f} MB on disk"
+          f" and {saved_memory_bytes / (1024 * 1024):.1f} MB of loaded pixels.")
+
+    return len(merged), saved_file_bytes
+
+#DDS formats that keep an alpha channel
+dds_alpha_formats = {'DXT2', 'DXT3', 'DXT4', 'DXT5', 'BC2', 'BC3', 'BC7', 'RGBA16', 'RGBA32', 'RGBA64', 'RGBA128'}
+
+#(filepath, size, modified time) -> DDS header, or None for other files
+dds_header_cache = {}
+
+def image_dds_header(image):
+
+    if image.packed_file or image.source != 'FILE':
+        return None
+
+    filepath = os.path.normpath(bpy.path.abspath(image.filepath))
+    if not os.path.isfile(filepath):
+        return None
+
+    stat = os.stat(filepath)
+    key = (filepath, stat.st_size, stat.st_mtime_ns)
+
+    if key not in dds_header_cache:
+        dds_header_cache[key] = read_dds_header(filepath)
+
+    return dds_header_cache[key]
+
+def texture_memory_report(car_id = ""):
+
+    if not vehicle_collections(car_id):
+        print("No vehicle collection found, run Prepare Collection first.")
+        return None
+
+    #Group name -> images, so an image shared within a group is only counted once
+    groups = {"material": {}, "template": {}, "collection": {}}
+    sizes = {}
+    mismatches = []
+    not_dds = set()
+
+    for vehicle_collection in vehicle_collections(car_id):
+        index = index_vehicle(vehicle_collection)
+
+        for mat, objects in index.materials.items():
+            template = material_templates.get(str(mat.get("hpr_template", "")).partition(":")[0])
+            collections = {collection.name for obj in objects for collection in index.objects[obj]}
+
+            for node in index.nodes[mat]:
+                image = node.image
+                if image is None:
+                    continue
+
+                header = image_dds_header(image)
+                if header is None:
+                    not_dds.add(image.name)
+                    continue
+
+                sizes[image] = dds_memory_size(header)
+                groups["material"].setdefault(mat.name, set()).add(image)
+                groups["template"].setdefault(template.name if template else "(none)", set()).add(image)
+                for name in collections:
+                    groups["collection"].setdefault(name, set()).add(image)
+
+                #DXGI formats the add-on doesn't know can't be judged
+                if (template and node.name in template.alpha_samplers and header["format"] not in dds_alpha_formats
+                        and not header["format"].startswith("DXGI")):
+                    mismatches.append(f"{mat.name} > {node.name}: {image.name} is {header['format']}, {template.name} needs DXT5")
+
+    total = sum(sizes.values())
+    trace_count("dds_headers_read", len(sizes))
+
+    for group, members in groups.items():
+        print(f"{'By ' + group:<48}{'Textures':>10}{'MB':>10}")
+        for name, images in sorted(members.items(), key = lambda item: -sum(sizes[image] for image in item[1])):
+            print(f"    {name:<44}{len(images):>10}{sum(sizes[image] for image in images) / (1024 * 1024):>10.2f}")
+
+    for message in mismatches:
+        print("Format mismatch: " + message)
+
+    for name in sorted(not_dds):
+        print("Not a DDS file, not counted: " + name)
+
+    print(f"{len(sizes)} textures take {total / (1024 * 1024):.2f} MB of texture memory including mipmaps.")
+
+    return total, len(mismatches)
+
+#Live validation, kept up to date from depsgraph updates while enabled in the preferences
+live_validation_stale = True
+
+#(kind, name) -> problems of that object or material, only IDs with problems are kept
+live_validation_problems = {}
+
+#ID session_uid -> (kind, name) it was last validated under, so renames drop the old entry
+live_validation_keys = {}
+
+#Collection name -> name of the vehicle collection it belongs to
+live_vehicle_collections = {}
+
+#Session uids of the materials used by vehicle objects, templates rename materials
+live_vehicle_materials = set()
+
+def map_vehicle_collections():
+
+    live_vehicle_collections.clear()
+
+    for vehicle_collection in vehicle_collections():
+        for collection in [vehicle_collection] + list(vehicle_collection.children_recursive):
+            live_vehicle_collections[collection.name] = vehicle_collection.name
+
+def store_live_problems(kind, block, problems):
+
+    key = (kind, block.name)
+    previous = live_validation_keys.get(block.session_uid)
+
+    if previous and previous != key:
+        live_validation_problems.pop(previous, None)
+
+    live_validation_keys[block.session_uid] = key
+
+    if problems:
+        live_validation_problems[key] = problems
+    else:
+        live_validation_problems.pop(key, None)
+
+def rebuild_live_validation():
+
+    global live_validation_stale
+
+    live_validation_problems.clear()
+    live_validation_keys.clear()
+    live_vehicle_materials.clear()
+    map_vehicle_collections()
+
+    for vehicle_collection in vehicle_collections():
+        index = index_vehicle(vehicle_collection)
+
+        for obj, collections in index.objects.items():
+            store_live_problems('OBJECT', obj, validate_object(obj, collections, index.collection, index.graphics))
+
+        for mat in index.materials:
+            live_vehicle_materials.add(mat.session_uid)
+            store_live_problems('MATERIAL', mat, validate_material(mat, index.nodes[mat]))
+
+    for obj in loose_meshes(live_vehicle_collections):
+        store_live_problems('OBJECT', obj, validate_loose_object(obj))
+
+    live_validation_stale = False
+
+def revalidate_material(mat):
+
+    nodes = [node for node in mat.node_tree.nodes if node.type == 'TEX_IMAGE'] if mat.node_tree else []
+    store_live_problems('MATERIAL', mat, validate_material(mat, nodes))
+
+def revalidate_object(obj):
+
+    vehicle_name = None
+    collections = []
+
+    for collection in obj.users_collection:
+        if collection.name in live_vehicle_collections:
+            vehicle_name = live_vehicle_collections[collection.name]
+            collections.append(collection)
+
+    if vehicle_name is None:
+        store_live_problems('OBJECT', obj, validate_loose_object(obj))
+        return
+
+    vehicle_collection = bpy.data.collections[vehicle_name]
+    collections = [collection for collection in collections if live_vehicle_collections[collection.name] == vehicle_name]
+    store_live_problems('OBJECT', obj, validate_object(obj, collections, vehicle_collection, vehicle_graphics_collection(vehicle_collection)))
+
+    #Newly assigned materials become part of the vehicle
+    for slot in obj.material_slots:
+        if slot.material and slot.material.session_uid not in live_vehicle_materials:
+            live_vehicle_materials.add(slot.material.session_uid)
+            revalidate_material(slot.material)
+
+def purge_live_validation():
+
+    #Only runs over IDs that have problems, which stays small
+    for key in list(live_validation_problems):
+        kind, name = key
+
+        if kind == 'OBJECT':
+            obj = bpy.data.objects.get(name)
+            if obj is None:
+                del live_validation_problems[key]
+            else:
+                revalidate_object(obj)
+        elif bpy.data.materials.get(name) is None:
+            del live_validation_problems[key]
+
+def live_validation_report():
+
+    report = {rule: [] for rule in validation_rules}
+
+    for problems in live_validation_problems.values():
+        for rule, message in problems:
+            report[rule].append(message)
+
+    return report
+
+def redraw_validation_panels():
+
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+@persistent
+def live_validation_update(scene, depsgraph):
+
+    preferences = addon_preferences()
+    if not preferences or not preferences.live_validation:
+        return
+
+    if live_validation_stale:
+        rebuild_live_validation()
+        redraw_validation_panels()
+        return
+
+    objects = {}
+    materials = {}
+    collections_changed = False
+
+    #Only what this update touched gets validated again
+    for update in depsgraph.updates:
+        block = update.id.original
+
+        if isinstance(block, bpy.types.Object):
+            objects[block.session_uid] = block
+        elif isinstance(block, bpy.types.Material):
+            if block.session_uid in live_vehicle_materials:
+                materials[block.session_uid] = block
+        elif isinstance(block, bpy.types.Collection):
+            if block.name in live_vehicle_collections or block.name.startswith("VEH_"):
+                collections_changed = True
+
+    if not objects and not materials and not collections_changed:
+        return
+
+    #Links, unlinks and new sub-collections only show up on the collection
+    if collections_changed:
+        map_vehicle_collections()
+        purge_live_validation()
+
+    for obj in objects.values():
+        revalidate_object(obj)
+
+    for mat in materials.values():
+        revalidate_material(mat)
+
+    redraw_validation_panels()
+
+@persistent
+def invalidate_live_validation(*args):
+
+    #IDs are reallocated on load and undo, start over on the next update
+    global live_validation_stale
+    live_validation_stale = True
+
+def live_validation_toggled(self, context):
+
+    invalidate_live_validation()
+
+    if self.live_validation:
+        rebuild_live_validation()
+
+#Main Menu
+class EXPORTER_PLUGINS_MT_HPR(bpy.types.Menu):
+    
+    bl_idname = "EXPORTER_PLUGINS_MT_HPR"
+    bl_label = "HP Exporter Plugins"
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.menu("VEHICLE_SUBMENU_MT_HPR", icon = "AUTO")
+
+#Sub Menu
+class VEHICLE_SUBMENU_MT_HPR(bpy.types.Menu):
+
+    bl_idname = "VEHICLE_SUBMENU_MT_HPR"
+    bl_label = "Vehicle"
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.operator("initialize.scene", icon = "OUTLINER_COLLECTION")
+        layout.operator("assign.empty", icon = "EMPTY_AXIS")
+        layout.operator("assign.empty_modal", icon = "EMPTY_AXIS")
+        layout.operator("wheels.populate", icon = "MESH_CYLINDER")
+        layout.operator("mesh.optimize_cache", icon = "MOD_TRIANGULATE")
+        layout.operator("lod.generate", icon = "MOD_DECIM")
+        layout.operator("material.vehicle", icon = "MATERIAL")
+        layout.operator("material.vehicle_modal", icon = "MATERIAL")
+        layout.operator("material.vehicle_auto", icon = "SHADERFX")
+        layout.operator("validate.vehicle", icon = "CHECKMARK")
+        layout.operator("texture.deduplicate", icon = "IMAGE_DATA")
+        layout.operator("texture.memory_report", icon = "MEMORY")
+        layout.operator("library.build", icon = "ASSET_MANAGER")
+
+#Operators
+class Initialize_Scene_OT_HPR(bpy.types.Operator):
+    
+    bl_idname = "initialize.scene"
+    bl_label = "Prepare Collection"
+    bl_description = "Creates a main collection for the vehicle while importing default textures"
+    
+    clear_scene: BoolProperty(
+        name = "Clear Scene",
+        description = "Deletes everything in scene",
+        default = True,
+    )
+
+    only_this_vehicle: BoolProperty(
+        name = "Only clear this vehicle",
+        description = "Only deletes the collection of this vehicle and the data only it uses, keeping other vehicles and the default textures",
+        default = False,
+    )
+    
+    import_default_textures : BoolProperty(
+        name = "Import default Hot Pursuit Vehicle Textures",
+        description = "Import the default textures in VEHICLETEX.BIN",
+        default = True,
+    )
+
+    lazy_load_textures : BoolProperty(
+        name = "Load textures on demand",
+        description = "Add every default texture without reading the files, pixels are read once a texture is drawn",
+        default = True,
+    )
+    
+    use_asset_library : BoolProperty(
+        name = "Link from asset library",
+        description = "Link the default textures from the shared asset library instead of loading them into this file",
+        default = False,
+    )
+    
+    car_id : StringProperty(
+        name = "Vehicle ID",
+        description = "Enter the Car ID you wish to set the scene up for",
+        default = "0",
+    )
+        
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = False
+        layout.use_property_decorate = False  # No animation.
+        
+        ##
+        box = layout.box()
+        split = box.split(factor=0.75)
+        col = split.column(align=True)
+        col.label(text="Preferences", icon="OPTIONS")
+        
+        box.prop(self, "clear_scene")
+
+        if self.clear_scene:
+            box.prop(self, "only_this_vehicle")
+            box.prop(self, "car_id")
+
+        row = box.row()
+        row.enabled = False
+        row.prop(self, "import_default_textures")
+        box.prop(self, "use_asset_library")
+
+        row = box.row()
+        row.enabled = not self.use_asset_library
+        row.prop(self, "lazy_load_textures")
+        
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width = 250)
+    
+    def execute(self, context):
+        status = 0
+    
+        with OperatorTrace(self.bl_idname) as trace:
+            if self.clear_scene:
+                with trace.stage("clear"):
+                    if self.only_this_vehicle:
+                        status += clear_vehicle(self.car_id)
+                    else:
+                        status += clear_scene()
+
+                with trace.stage("setup_vehicle_id"):
+                    status += setup_vehicle_id(self.car_id)
+                
+            if self.import_default_textures and self.use_asset_library:
+                with trace.stage("link_asset_library"):
+                    status += link_asset_library()
+            elif self.import_default_textures:
+                with trace.stage("import_default_hp_textures"):
+                    status += import_default_hp_textures(lazy = self.lazy_load_textures)
+            
+        if status == 0:
+            self.report({'INFO'}, "Scene prepared.")
+        else:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+            
+        return {'FINISHED'}
+        
+class Assign_Empty_OT_HPR(bpy.types.Operator):
+    
+    bl_idname = "assign.empty"
+    bl_label = "Assign parent to selected mesh (Body only)"
+    bl_description = "Auto assign each mesh a parent with the correct rotation."
+    
+    only_selected: BoolProperty(
+        name = "Only selected mesh",
+        description = "Only assign parent to selected meshes",
+        default = True,
+    )
+
+    batch_mode: BoolProperty(
+        name = "Batch mode",
+        description = "Parent all meshes in a single pass instead of running operators for each mesh",
+        default = True,
+    )
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = False
+        layout.use_property_decorate = False  # No animation.
+        
+        ##
+        box = layout.box()
+        split = box.split(factor=0.75)
+        col = split.column(align=True)
+        col.label(text="Preferences", icon="OPTIONS")
+        
+        row = box.row()
+        row.enabled = False
+        row.prop(self, "only_selected")
+
+        box.prop(self, "batch_mode")
+        
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width = 250)   
+        
+    def execute(self, context):
+        status = 0
+    
+        with OperatorTrace(self.bl_idname) as trace:
+            if self.only_selected:
+                with trace.stage("apply_mesh_rotation"):
+                    status += apply_mesh_rotation(batch = self.batch_mode)
+            
+        if status == 0:
+            self.report({'INFO'}, "Parents applied to mesh.")
+        else:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+            
+        return {'FINISHED'}
+
+class Populate_Wheels_OT_HPR(bpy.types.Operator):
+
+    bl_idname = "wheels.populate"
+    bl_label = "Populate Wheels from selected mesh"
+    bl_description = "Move the selected front left wheel (tyre, rim, caliper, rotor) into the Wheels collection and add the other three corners, sharing its mesh data"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    car_id : StringProperty(
+        name = "Vehicle ID",
+        description = "Car ID of the vehicle the wheels belong to",
+        default = "0",
+    )
+
+    wheelbase : FloatProperty(
+        name = "Wheelbase",
+        description = "Distance between the front and rear axle",
+        default = 2.6,
+        min = 0.0,
+        subtype = 'DISTANCE',
+    )
+
+    forward_axis : EnumProperty(
+        name = "Forward axis",
+        description = "Axis the vehicle faces, left and right wheels are mirrored along the other horizontal axis",
+        items = [(axis, axis, "Vehicle faces " + axis) for axis in wheel_axes],
+        default = 'Y',
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = False
+        layout.use_property_decorate = False  # No animation.
+        
+        ##
+        box = layout.box()
+        split = box.split(factor=0.75)
+        col = split.column(align=True)
+        col.label(text="Preferences", icon="OPTIONS")
+        
+        box.prop(self, "car_id")
+        box.prop(self, "wheelbase")
+        box.prop(self, "forward_axis")
+        
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width = 250)
+
+    def execute(self, context):
+        with OperatorTrace(self.bl_idname) as trace:
+            with trace.stage("populate_wheels"):
+                status = populate_wheels(self.car_id, self.wheelbase, self.forward_axis)
+
+        if status == 0:
+            self.report({'INFO'}, "Wheels added.")
+        else:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+
+        return {'FINISHED'}
+
+class Optimize_Cache_OT_HPR(bpy.types.Operator):
+
+    bl_idname = "mesh.optimize_cache"
+    bl_label = "Optimize Vertex Cache"
+    bl_description = "Triangulate the selected meshes and reorder triangles and vertices for the GPU vertex cache. Run after assigning parents"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    cache_size : IntProperty(
+        name = "Cache size",
+        description = "Number of vertices the post-transform cache is assumed to hold",
+        default = 16,
+        min = 4,
+        max = 64,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = False
+        layout.use_property_decorate = False  # No animation.
+        
+        ##
+        box = layout.box()
+        split = box.split(factor=0.75)
+        col = split.column(align=True)
+        col.label(text="Preferences", icon="OPTIONS")
+        
+        box.prop(self, "cache_size")
+        
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width = 250)
+
+    def execute(self, context):
+        with OperatorTrace(self.bl_idname) as trace:
+            with trace.stage("optimize_vertex_cache"):
+                status = optimize_vertex_cache(only_selected_mesh(), self.cache_size)
+
+        if status == 0:
+            self.report({'INFO'}, "Meshes optimized, ACMR is printed to the console.")
+        else:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+
+        return {'FINISHED'}
+
+class Generate_LOD_OT_HPR(bpy.types.Operator):
+
+    bl_idname = "lod.generate"
+    bl_label = "Generate LODs"
+    bl_description = "Decimate every mesh of the vehicle into lower detail levels, using several Blender processes at once"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    car_id : StringProperty(
+        name = "Vehicle ID",
+        description = "Car ID of the vehicle to generate LODs for",
+        default = "0",
+    )
+
+    ratios : StringProperty(
+        name = "Triangle ratios",
+        description = "Comma separated share of triangles each LOD keeps",
+        default = "0.5,0.25,0.1",
+    )
+
+    workers : IntProperty(
+        name = "Workers",
+        description = "Number of Blender processes to decimate with",
+        default = os.cpu_count() or 1,
+        min = 1,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = False
+        layout.use_property_decorate = False  # No animation.
+        
+        ##
+        box = layout.box()
+        split = box.split(factor=0.75)
+        col = split.column(align=True)
+        col.label(text="Preferences", icon="OPTIONS")
+        
+        box.prop(self, "car_id")
+        box.prop(self, "ratios")
+        box.prop(self, "workers")
+        
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width = 250)
+
+    def execute(self, context):
+        try:
+            ratios = [float(ratio) for ratio in self.ratios.split(",")]
+        except ValueError:
+            self.report({'ERROR'}, "Triangle ratios have to be numbers, e.g. 0.5,0.25,0.1")
+            return {'CANCELLED'}
+
+        with OperatorTrace(self.bl_idname) as trace:
+            with trace.stage("generate_lods"):
+                status = generate_lods(self.car_id, ratios, self.workers)
+
+        if status == 0:
+            self.report({'INFO'}, "LODs generated.")
+        else:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+
+        return {'FINISHED'}
+
+class MaterialTemplateProperties:
+
+    #Template choice shared by the material template operators, draw_properties lists what the dialog shows
+    enum_items = [(entry["key"], entry["label"], entry["description"]) for entry in material_template_table]
+
+    #sort list
+    sorted_enum_items = sorted(enum_items, key = lambda item: item[1])
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Textured_Phong"
-        mat.name = "PlasticBlack_" + mat.name
+    enum_mat_name: bpy.props.EnumProperty(
+        name = "Setting",
+        description = "Choose a material template",
+        items = sorted_enum_items
+    )
 
-        status += createImageNode(mat, "DiffuseTextureSampler", '89_20_8C_6D.dds')
+    update_existing: BoolProperty(
+        name = "Update existing",
+        description = "Only write what differs on materials that already have a template, skipping ones that are up to date",
+        default = True,
+    )
 
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [1.0, 0.699999988079071, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.0500000007450581, 0.850000023841858, 2.0, 1.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [0.00150000001303852, 0.0, 0.0, 0.0])
+    draw_properties = ("enum_mat_name", "update_existing")
 
-    return status, "PlasticBlack"
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = False
+        layout.use_property_decorate = False  # No animation.
+        
+        ##
+        box = layout.box()
+        split = box.split(factor=0.75)
+        col = split.column(align=True)
+        col.label(text="Preferences", icon="OPTIONS")
+        
+        for name in self.draw_properties:
+            box.prop(self, name)
+        
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width = 250)
 
-def material_Mirror(mat):
+class Material_Vehicles_OT_HPR(MaterialTemplateProperties, bpy.types.Operator):
 
-    status = 0
+    bl_idname = "material.vehicle"
+    bl_label = "Vehicle Material Templates"
+    bl_description = "Material templates for vehicles with pre-tuned values."
+    bl_options = {'REGISTER', 'UNDO'}
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Reflective"
-        mat.name = "Mirror_" + mat.name
+    all_selected: BoolProperty(
+        name = "All selected meshes",
+        description = "Apply the template to every material slot of every selected mesh instead of only the active material",
+        default = False,
+    )
 
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [9.999999747378752e-06, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [1.0, 0.5, 3.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.05000000074505806, 0.10000000149011612, 4.0, 1.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
+    draw_properties = ("enum_mat_name", "all_selected", "update_existing")
 
-    return status, "Mirror"
+    def execute(self, context):
 
-def material_PlateRacer(mat):
+        template = material_templates[self.enum_mat_name]
 
-    status = 0
+        if self.all_selected:
+            with OperatorTrace(self.bl_idname) as trace:
+                with trace.stage("apply_material_template_batch"):
+                    processed, skipped, failed = apply_material_template_batch(template, self.update_existing)
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Textured_NormalMapped_Reflective_Emissive_AO_Livery"
-        mat.name = "PlateRacer_" + mat.name
-        
-        status += createImageNode(mat, "NormalTextureSampler", '19_97_AA_7C.dds')
-        status += createImageNode(mat, "DiffuseTextureSampler", '10_C3_82_CD.dds')
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", 'E7_A5_A4_93.dds')
-
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 1.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [0.0010000000474974513, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [0.009999999776482582, 0.009999999776482582, 3.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mScratchSpecularControls", [0.25, 0.25, 50.0, 0.10000000149011612])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [0.4, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.04, 0.7, 35.0, 0.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
-
-    return status, "PlateRacer"
-
-def material_PlateCop(mat):
+                trace_count("materials_processed", processed)
+                trace_count("materials_skipped", skipped)
+                trace_count("materials_failed", failed)
 
-    status = 0
+            summary = f"Applied material template \'{template.name}\' to {processed} materials ({skipped} skipped, {failed} failed)."
 
-    if mat:
-        mat["shader_type"] = "Vehicle_Opaque_Textured_NormalMapped_Reflective_Emissive_AO_Livery"
-        mat.name = "PlateCop_" + mat.name
-        
-        status += createImageNode(mat, "NormalTextureSampler", 'F9_E1_60_01.dds')
-        status += createImageNode(mat, "DiffuseTextureSampler", '75_C5_BD_C5.dds')
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", 'E7_A5_A4_93.dds')
-
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 1.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [0.0010000000474974513, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mReflectionControls", [0.009999999776482582, 0.009999999776482582, 3.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mScratchSpecularControls", [0.25, 0.25, 50.0, 0.10000000149011612])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [0.4, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.04, 0.7, 35.0, 0.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [1.0, 1.0, 1.0, 1.0])
-
-    return status, "PlateCop"
-
-def material_InteriorBadge(mat):
+            if failed == 0:
+                self.report({'INFO'}, summary)
+            else:
+                self.report({'ERROR'}, summary + " Please check console log for more information.")
 
-    status = 0
+            return {'FINISHED'}
 
-    if mat:
-        mat["shader_type"] = "Vehicle_1Bit_Textured_NormalMapped_Emissive_AO_Livery"
-        mat.name = "InteriorBadge_" + mat.name
-
-        status += createImageNode(mat, "NormalTextureSampler", 'E7_A5_A4_93.dds')
-        status += createImageNode(mat, "DiffuseTextureSampler")
-        status += createImageNode(mat, "AoMapTextureSampler", '13_94_2A_CA.dds')
-        status += createImageNode(mat, "ScratchTextureSampler", '85_68_7E_F0.dds')
-        status += createImageNode(mat, "LightmapLightsTextureSampler", '89_20_8C_6D.dds')
-
-        status += createMaterialCustomProperty(mat, "LightMultipliers", [1.0, 1.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsBlueChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsGreenChannelColour", [1.0, 1.0, 1.0, 1.0])
-        status += createMaterialCustomProperty(mat, "LightmappedLightsRedChannelColour", [1.0, 0.0, 0.0, 1.0])
-        status += createMaterialCustomProperty(mat, "MaterialShadowMapBias", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mEmissiveAdditiveAmount", [0.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mScratchSpecularControls", [0.009999999776482582, 0.15000000596046448, 5.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSelfIlluminationMultiplier", [1.0, 0.0, 0.0, 0.0])
-        status += createMaterialCustomProperty(mat, "mSpecularControls", [0.05, 0.5, 25.0, 0.0])
-        status += createMaterialCustomProperty(mat, "materialDiffuse", [0.016807, 0.016807, 0.016807, 1.0])
-
-    return status, "InteriorBadge"
+        status = 0
 
-#Main Menu
-class EXPORTER_PLUGINS_MT_HPR(bpy.types.Menu):
-    
-    bl_idname = "EXPORTER_PLUGINS_MT_HPR"
-    bl_label = "HP Exporter Plugins"
-    
-    def draw(self, context):
-        layout = self.layout
-        layout.menu("VEHICLE_SUBMENU_MT_HPR", icon = "AUTO")
+        with OperatorTrace(self.bl_idname) as trace:
+            with trace.stage("apply_material_template"):
+                mat = getMaterial()
+                status, description = apply_material_template(mat, template, self.update_existing)
 
-#Sub Menu
-class VEHICLE_SUBMENU_MT_HPR(bpy.types.Menu):
+        if status == template_up_to_date:
+            self.report({'INFO'}, f"Selected material is already up to date with material template \'{description}\'.")
+        elif status == 0:
+            self.report({'INFO'}, f"Successfully applied material template \'{description}\' to selected material.")
+        else:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+        
+        return {'FINISHED'}
 
-    bl_idname = "VEHICLE_SUBMENU_MT_HPR"
-    bl_label = "Vehicle"
-    
-    def draw(self, context):
-        layout = self.layout
-        layout.operator("initialize.scene", icon = "OUTLINER_COLLECTION")
-        layout.operator("assign.empty", icon = "EMPTY_AXIS")
-        layout.operator("material.vehicle", icon = "MATERIAL")
+class Auto_Material_Vehicles_OT_HPR(bpy.types.Operator):
 
-#Operators
-class Initialize_Scene_OT_HPR(bpy.types.Operator):
-    
-    bl_idname = "initialize.scene"
-    bl_label = "Prepare Collection"
-    bl_description = "Creates a main collection for the vehicle while importing default textures"
-    
-    clear_scene: BoolProperty(
-        name = "Clear Scene",
-        description = "Deletes everything in scene",
-        default = True,
+    bl_idname = "material.vehicle_auto"
+    bl_label = "Auto Assign Material Templates"
+    bl_description = "Assign material templates to the materials of selected meshes based on their names."
+    bl_options = {'REGISTER', 'UNDO'}
+
+    rules_path: StringProperty(
+        name = "Rules file",
+        description = "JSON file with name patterns and the template they map to, leave empty for the built-in rules",
+        default = "",
+        subtype = 'FILE_PATH',
     )
-    
-    import_default_textures : BoolProperty(
-        name = "Import default Hot Pursuit Vehicle Textures",
-        description = "Import the default textures in VEHICLETEX.BIN",
+
+    dry_run: BoolProperty(
+        name = "Dry run",
+        description = "Only print which template each material would get to the console",
         default = True,
     )
-    
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = False
+        layout.use_property_decorate = False  # No animation.
+        
+        ##
+        box = layout.box()
+        split = box.split(factor=0.75)
+        col = split.column(align=True)
+        col.label(text="Preferences", icon="OPTIONS")
+        
+        box.prop(self, "rules_path")
+        box.prop(self, "dry_run")
+        
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self, width = 350)
+
+    def execute(self, context):
+
+        try:
+            processed, skipped, failed = auto_assign_material_templates(self.rules_path, self.dry_run)
+        except (OSError, KeyError, ValueError, re.error) as error:
+            print("Could not load material rules: " + str(error))
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+            return {'CANCELLED'}
+
+        if self.dry_run:
+            self.report({'INFO'}, f"{processed} materials would get a template ({skipped} skipped). Please check console log for the full table.")
+        elif failed == 0:
+            self.report({'INFO'}, f"Assigned templates to {processed} materials ({skipped} skipped).")
+        else:
+            self.report({'ERROR'}, f"Assigned templates to {processed} materials ({skipped} skipped, {failed} failed). Please check console log for more information.")
+
+        return {'FINISHED'}
+
+class Validate_Vehicle_OT_HPR(bpy.types.Operator):
+
+    bl_idname = "validate.vehicle"
+    bl_label = "Validate Vehicle"
+    bl_description = "Check the vehicle collections for problems that would only show up when exporting"
+
     car_id : StringProperty(
         name = "Vehicle ID",
-        description = "Enter the Car ID you wish to set the scene up for",
-        default = "0",
+        description = "Car ID of the vehicle to validate, leave empty to validate every vehicle in the scene",
+        default = "",
     )
-        
+
     def draw(self, context):
         layout = self.layout
         layout.use_property_split = False
@@ -824,48 +3437,49 @@ class Initialize_Scene_OT_HPR(bpy.types.Operator):
         col = split.column(align=True)
         col.label(text="Preferences", icon="OPTIONS")
         
-        box.prop(self, "clear_scene")
-
-        if self.clear_scene:
-            box.prop(self, "car_id")
-
-        row = box.row()
-        row.enabled = False
-        row.prop(self, "import_default_textures")
+        box.prop(self, "car_id")
         
     def invoke(self, context, event):
         wm = context.window_manager
         return wm.invoke_props_dialog(self, width = 250)
-    
+
     def execute(self, context):
-        status = 0
-    
-        if self.clear_scene:
-            status += clear_scene()
-            status += setup_vehicle_id(self.car_id)
-            
-        if self.import_default_textures:
-            status += import_default_hp_textures()
-            
-        if status == 0:
-            self.report({'INFO'}, "Scene prepared.")
-        else:
+        with OperatorTrace(self.bl_idname) as trace:
+            with trace.stage("validate_vehicle"):
+                report = validate_vehicle(self.car_id)
+
+        if report is None:
             self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
-            
+            return {'CANCELLED'}
+
+        problems = print_validation_report(report)
+
+        if problems == 0:
+            self.report({'INFO'}, "Vehicle is ready for exporting.")
+        else:
+            self.report({'WARNING'}, f"Found {problems} problems. Please check console log for more information.")
+
         return {'FINISHED'}
-        
-class Assign_Empty_OT_HPR(bpy.types.Operator):
-    
-    bl_idname = "assign.empty"
-    bl_label = "Assign parent to selected mesh (Body only)"
-    bl_description = "Auto assign each mesh a parent with the correct rotation."
-    
-    only_selected: BoolProperty(
-        name = "Only selected mesh",
-        description = "Only assign parent to selected meshes",
-        default = True,
+
+class Deduplicate_Textures_OT_HPR(bpy.types.Operator):
+
+    bl_idname = "texture.deduplicate"
+    bl_label = "Merge Duplicate Textures"
+    bl_description = "Merge images of the vehicle whose files have the same content into one image"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    car_id : StringProperty(
+        name = "Vehicle ID",
+        description = "Car ID of the vehicle, leave empty for every vehicle in the scene",
+        default = "",
     )
-    
+
+    dry_run : BoolProperty(
+        name = "Dry run",
+        description = "Only print the duplicates found to the console without merging them",
+        default = False,
+    )
+
     def draw(self, context):
         layout = self.layout
         layout.use_property_split = False
@@ -877,64 +3491,38 @@ class Assign_Empty_OT_HPR(bpy.types.Operator):
         col = split.column(align=True)
         col.label(text="Preferences", icon="OPTIONS")
         
-        box.prop(self, "only_selected")
-        box.enabled = False
+        box.prop(self, "car_id")
+        box.prop(self, "dry_run")
         
     def invoke(self, context, event):
         wm = context.window_manager
-        return wm.invoke_props_dialog(self, width = 250)   
-        
+        return wm.invoke_props_dialog(self, width = 250)
+
     def execute(self, context):
-        status = 0
-    
-        if self.only_selected:
-            status += apply_mesh_rotation()
-            
-        if status == 0:
-            self.report({'INFO'}, "Parents applied to mesh.")
-        else:
+        with OperatorTrace(self.bl_idname) as trace:
+            with trace.stage("deduplicate_images"):
+                result = deduplicate_images(self.car_id, self.dry_run)
+
+        if result is None:
             self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
-            
-        return {'FINISHED'}
+            return {'CANCELLED'}
 
-class Material_Vehicles_OT_HPR(bpy.types.Operator):
+        merged, saved_bytes = result
+        verb = "Found" if self.dry_run else "Merged"
+        self.report({'INFO'}, f"{verb} {merged} duplicate images ({saved_bytes / (1024 * 1024):.1f} MB).")
 
-    bl_idname = "material.vehicle"
-    bl_label = "Vehicle Material Templates"
-    bl_description = "Material templates for vehicles with pre-tuned values."
+        return {'FINISHED'}
 
-    enum_items = [
-            ('Badge', "Badge", "Material for badges, which supports transparency"),
-            ('Glass', "Glass", "Material for glass"),
-            ('Glass_Red', "GlassRed (Taillight Glass)", "Material for taillight glass (Red)"),
-            ('Glass_Livery', "GlassLivery", "Material for glass that supports wrap editing"),
-            ('Glass_Surround', "GlassSurround", "Material for glass that surrounds the windshield, livery is supported"),
-            ('Grille', "Grille", "Material for grille, which supports transparency"),
-            ('Interior', "Interior", "Material for interior that doesn't support emissive nor transparency"),
-            ('Interior_Emissive', "InteriorEmissive", "Material for emissives part in interior"),
-            ('Lights', "Lights", "Material for lights"),
-            ('Metal_Chrome', "MetalChrome", "Material for metallic chrome"),
-            ('Metal_Colorable', "MetalColorable", "Material for vehicle paint which supports livery editing"),
-            ('Metal_Half_Livery', "MetalHalfLivery", "Material that supports vehicle wrap, transparency area would be paint colour"),
-            ('Metal_Livery_Carbon', "MetalLiveryCarbon", "Material for carbon fiber"),
-            ('Metal_Livery_Gloss', "MetalLiveryGloss", "Material for glossy looking diffuse"),
-            ('Metal_Livery_Matte', "MetalLiveryMatte", "Material for matte looking diffuse"),
-            ('Metal_Secondary_Coloured_Livery', "MetalSecondaryColouredLivery", "Material for vehicle paint that has secondary colour setting"),
-            ('Opaque_DULL', "OpaqueDULL", "Material for dull looking diffuse"),
-            ('Plastic_Black', "PlasticBlack", "Material for pure black"),
-            ('Mirror', "Mirror", "Material for mirrors"),
-            ('Plate_Racer', "PlateRacer", "Material for racer variant license plate"),
-            ('Plate_Cop', "PlateCop", "Material for cop variant license plate"),
-            ('Interior_Badge', "InteriorBadge", "Material for interior badging for more details"),
-        ]
+class Texture_Memory_OT_HPR(bpy.types.Operator):
 
-    #sort list
-    sorted_enum_items = sorted(enum_items, key = lambda item: item[1])
+    bl_idname = "texture.memory_report"
+    bl_label = "Texture Memory Report"
+    bl_description = "Print how much texture memory the vehicle takes in game from the DDS headers, by material, template and collection"
 
-    enum_mat_name: bpy.props.EnumProperty(
-        name = "Setting",
-        description = "Choose a material template",
-        items = sorted_enum_items
+    car_id : StringProperty(
+        name = "Vehicle ID",
+        description = "Car ID of the vehicle, leave empty for every vehicle in the scene",
+        default = "",
     )
 
     def draw(self, context):
@@ -948,67 +3536,317 @@ class Material_Vehicles_OT_HPR(bpy.types.Operator):
         col = split.column(align=True)
         col.label(text="Preferences", icon="OPTIONS")
         
-        box.prop(self, "enum_mat_name")
+        box.prop(self, "car_id")
         
     def invoke(self, context, event):
         wm = context.window_manager
         return wm.invoke_props_dialog(self, width = 250)
 
     def execute(self, context):
+        with OperatorTrace(self.bl_idname) as trace:
+            with trace.stage("texture_memory_report"):
+                result = texture_memory_report(self.car_id)
 
-        option_functions = {
-            'Badge' : material_Badge,
-            'Glass': material_Glass,
-            'Glass_Red': material_GlassRed,
-            'Glass_Livery' : material_GlassLivery,
-            'Glass_Surround' : material_GlassSurround,
-            'Grille' : material_Grille,
-            'Interior' : material_Interior,
-            'Interior_Emissive' : material_InteriorEmissive,
-            'Lights' : material_Lights,
-            'Metal_Chrome' : material_MetalChrome,
-            'Metal_Colorable' : material_MetalColorable,
-            'Metal_Half_Livery' : material_MetalHalfLivery,
-            'Metal_Livery_Carbon' : material_MetalLiveryCarbon,
-            'Metal_Livery_Gloss' : material_MetalLiveryGloss,
-            'Metal_Livery_Matte' : material_MetalLiveryMatte,
-            'Metal_Secondary_Coloured_Livery' : material_MetalSecondaryColouredLivery,
-            'Opaque_DULL' : material_OpaqueDULL,
-            'Plastic_Black' : material_PlasticBlack,
-            'Mirror' : material_Mirror,
-            'Plate_Racer' : material_PlateRacer,
-            'Plate_Cop' : material_PlateCop,
-            'Interior_Badge' : material_InteriorBadge,
-        }
+        if result is None:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+            return {'CANCELLED'}
 
-        status = 0
-        mat = getMaterial()
-        status, description = option_functions[self.enum_mat_name](mat)
+        total, mismatches = result
+        summary = f"Textures take {total / (1024 * 1024):.2f} MB."
+
+        if mismatches == 0:
+            self.report({'INFO'}, summary)
+        else:
+            self.report({'WARNING'}, summary + f" {mismatches} textures need DXT5. Please check console log for more information.")
+
+        return {'FINISHED'}
+
+class Build_Asset_Library_OT_HPR(bpy.types.Operator):
+
+    bl_idname = "library.build"
+    bl_label = "Build Asset Library"
+    bl_description = "Write the default textures and a material for each template to a .blend that vehicle files can link to"
+
+    def execute(self, context):
+        with OperatorTrace(self.bl_idname) as trace:
+            with trace.stage("build_asset_library"):
+                status = build_asset_library()
 
         if status == 0:
-            self.report({'INFO'}, f"Successfully applied material template \'{description}\' to selected material.")
+            self.report({'INFO'}, "Asset library written to " + asset_library_path())
         else:
             self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
-        
+
+        return {'FINISHED'}
+
+class Refresh_Validation_OT_HPR(bpy.types.Operator):
+
+    bl_idname = "validate.vehicle_refresh"
+    bl_label = "Revalidate"
+    bl_description = "Validate every vehicle again from scratch"
+
+    def execute(self, context):
+        rebuild_live_validation()
+        return {'FINISHED'}
+
+class VALIDATION_PT_HPR(bpy.types.Panel):
+
+    bl_idname = "VALIDATION_PT_HPR"
+    bl_label = "Vehicle Validation"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "HP Exporter"
+
+    def draw(self, context):
+        layout = self.layout
+        preferences = addon_preferences()
+
+        row = layout.row()
+        if preferences:
+            row.prop(preferences, "live_validation")
+        row.operator("validate.vehicle_refresh", text = "", icon = "FILE_REFRESH")
+
+        if not preferences or not preferences.live_validation:
+            return
+
+        if live_validation_stale:
+            layout.label(text = "Waiting for the next update...")
+            return
+
+        report = live_validation_report()
+
+        if not any(report.values()):
+            layout.label(text = "No problems found.", icon = "CHECKMARK")
+            return
+
+        for rule, messages in report.items():
+            if messages:
+                box = layout.box()
+                box.label(text = validation_rules[rule] + " (" + str(len(messages)) + ")", icon = "ERROR")
+                for message in messages:
+                    box.label(text = message)
+
+#Events that only move the view, the rest is held back while a job runs since undo or edits would free what it works on
+modal_navigation_events = {
+    'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'TRACKPADPAN', 'TRACKPADZOOM',
+    'NDOF_MOTION', 'NUMPAD_0', 'NUMPAD_1', 'NUMPAD_2', 'NUMPAD_3', 'NUMPAD_4', 'NUMPAD_5', 'NUMPAD_6', 'NUMPAD_7',
+    'NUMPAD_8', 'NUMPAD_9', 'NUMPAD_PERIOD', 'NUMPAD_MINUS', 'NUMPAD_PLUS',
+}
+
+class ChunkedModalOperator:
+
+    #Runs a job (items, process, finish, rollback) in chunks from a timer, sized to stay within frame_budget
+    frame_budget = 1.0 / 30.0
+
+    def start_job(self, context, job):
+        self.job = job
+        self.index = 0
+        self.chunk_size = 1
+        self.status = 0
+        self.last_tick = -1.0
+
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.001, window = context.window)
+        wm.modal_handler_add(self)
+        wm.progress_begin(0, max(1, len(job.items)))
+
+        return {'RUNNING_MODAL'}
+
+    def stop_job(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            self.job.rollback()
+            self.stop_job(context)
+            self.report({'WARNING'}, "Cancelled, all changes have been rolled back.")
+            return {'CANCELLED'}
+
+        if event.type in modal_navigation_events:
+            return {'PASS_THROUGH'}
+
+        if event.type != 'TIMER':
+            return {'RUNNING_MODAL'}
+
+        #Other timers send the same event type, only a tick of our own timer moves its duration
+        if self.timer.time_duration == self.last_tick:
+            return {'PASS_THROUGH'}
+        self.last_tick = self.timer.time_duration
+
+        try:
+            return self.run_chunk(context)
+        except Exception as error:
+            #Never leave the timer and status text behind
+            print("Job failed, rolling back: " + str(error))
+            try:
+                self.job.rollback()
+            except ReferenceError:
+                pass
+            self.stop_job(context)
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+            return {'CANCELLED'}
+
+    def run_chunk(self, context):
+        items = self.job.items
+        end = min(self.index + self.chunk_size, len(items))
+        start = time.perf_counter()
+
+        for item in items[self.index:end]:
+            self.status += self.job.process(item)
+
+        #Aim the next chunk at the frame budget, without swinging more than 2x at a time
+        elapsed = time.perf_counter() - start
+        if end > self.index:
+            target = int(self.frame_budget / max(elapsed / (end - self.index), 1e-6))
+            self.chunk_size = max(1, min(target, self.chunk_size * 2), self.chunk_size // 2)
+
+        self.index = end
+        context.window_manager.progress_update(self.index)
+        context.workspace.status_text_set(f"{self.bl_label}: {self.index} / {len(items)} (Esc to cancel)")
+
+        if self.index < len(items):
+            return {'RUNNING_MODAL'}
+
+        self.job.finish()
+        self.stop_job(context)
+        self.report_finished()
+
         return {'FINISHED'}
 
+class Assign_Empty_Modal_OT_HPR(ChunkedModalOperator, bpy.types.Operator):
+
+    bl_idname = "assign.empty_modal"
+    bl_label = "Assign parent to selected mesh (Background)"
+    bl_description = "Assign parents like the batch mode, keeping Blender responsive. Press Esc to cancel and roll back."
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        meshes = only_selected_mesh()
+
+        if check_mesh_rotation(meshes, batch = True) != 0:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+            return {'CANCELLED'}
+
+        return self.start_job(context, MeshRotationJob(meshes, keep_rollback = True))
+
+    def report_finished(self):
+        if self.status == 0:
+            self.report({'INFO'}, "Parents applied to mesh.")
+        else:
+            self.report({'ERROR'}, "An error has occured. Please check console log for more information.")
+
+class Material_Vehicles_Modal_OT_HPR(ChunkedModalOperator, MaterialTemplateProperties, bpy.types.Operator):
+
+    bl_idname = "material.vehicle_modal"
+    bl_label = "Vehicle Material Templates (Background)"
+    bl_description = "Apply a material template to all selected meshes, keeping Blender responsive. Press Esc to cancel and roll back."
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        job = MaterialTemplateJob(material_templates[self.enum_mat_name], self.update_existing, keep_rollback = True)
+        return self.start_job(context, job)
+
+    def report_finished(self):
+        job = self.job
+        summary = f"Applied material template \'{job.template.name}\' to {job.processed} materials ({job.skipped} skipped, {job.failed} failed)."
+
+        if job.failed == 0:
+            self.report({'INFO'}, summary)
+        else:
+            self.report({'ERROR'}, summary + " Please check console log for more information.")
+
+class Preferences_HPR(bpy.types.AddonPreferences):
+
+    bl_idname = __name__
+
+    write_traces: BoolProperty(
+        name = "Write timing traces",
+        description = "Write the stage timings and counters of every operator run to a JSON file",
+        default = False,
+    )
+
+    profile_operators: BoolProperty(
+        name = "Profile operators",
+        description = "Run operators under cProfile and add the slowest functions to the JSON trace",
+        default = False,
+    )
+
+    trace_directory: StringProperty(
+        name = "Trace directory",
+        description = "Where JSON traces are written, defaults to Blender's temporary directory",
+        default = "",
+        subtype = 'DIR_PATH',
+    )
+
+    asset_library_path: StringProperty(
+        name = "Asset library",
+        description = "Shared .blend with the default textures and template materials, defaults to HP_DefaultTextures/HPR_AssetLibrary.blend",
+        default = "",
+        subtype = 'FILE_PATH',
+    )
+
+    live_validation: BoolProperty(
+        name = "Live validation",
+        description = "Validate objects and materials of the vehicle collections as they are edited, shown in the sidebar",
+        default = False,
+        update = live_validation_toggled,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "write_traces")
+        layout.prop(self, "profile_operators")
+        layout.prop(self, "trace_directory")
+        layout.prop(self, "asset_library_path")
+        layout.prop(self, "live_validation")
+
 register_classes = (
+    Preferences_HPR,
     EXPORTER_PLUGINS_MT_HPR,
     VEHICLE_SUBMENU_MT_HPR,
     Initialize_Scene_OT_HPR,
     Assign_Empty_OT_HPR,
+    Populate_Wheels_OT_HPR,
+    Optimize_Cache_OT_HPR,
+    Generate_LOD_OT_HPR,
     Material_Vehicles_OT_HPR,
+    Auto_Material_Vehicles_OT_HPR,
+    Assign_Empty_Modal_OT_HPR,
+    Material_Vehicles_Modal_OT_HPR,
+    Validate_Vehicle_OT_HPR,
+    Deduplicate_Textures_OT_HPR,
+    Texture_Memory_OT_HPR,
+    Build_Asset_Library_OT_HPR,
+    Refresh_Validation_OT_HPR,
+    VALIDATION_PT_HPR,
 )
 
+def data_reload_handlers():
+    return (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post)
+
 def menu_func(self, context):
     self.layout.menu(EXPORTER_PLUGINS_MT_HPR.bl_idname)
 
 def register():
     for items in register_classes:
         bpy.utils.register_class(items)
+    compile_material_templates()
+    if load_texture_manifest() == 0:
+        check_template_textures()
+    for handlers in data_reload_handlers():
+        handlers.append(invalidate_live_validation)
+    bpy.app.handlers.depsgraph_update_post.append(live_validation_update)
     bpy.types.VIEW3D_MT_add.append(menu_func)
 
 def unregister():
     bpy.types.VIEW3D_MT_add.remove(menu_func)
+    if live_validation_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(live_validation_update)
+    for handlers in data_reload_handlers():
+        if invalidate_live_validation in handlers:
+            handlers.remove(invalidate_live_validation)
     for items in register_classes:
         bpy.utils.unregister_class(items)
\ No newline at end of file
@@ -0,0 +1,73 @@
+#LOD worker for HP Exporter Plugins
+#
+#Usage (started by the Generate LODs operator, one process per chunk of meshes):
+#   blender -b --factory-startup --python hpr_lod.py -- job.json
+#
+#The job lists the meshes in its input .npz (flat arrays from mesh_to_arrays()) and the triangle
+#ratios to decimate them to. Every LOD is written to the output .npz under "<key>_<level>_".
+
+import json
+import os
+import sys
+
+import bpy
+import numpy
+
+script_directory = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_directory)
+
+import hpr_exporter_plugins as hpr
+
+def script_arguments():
+
+    #Blender keeps its own arguments before "--"
+    if "--" in sys.argv:
+        return sys.argv[sys.argv.index("--") + 1:]
+    return sys.argv[1:]
+
+def decimate_meshes(job):
+
+    arrays = numpy.load(job["input"])
+    results = {}
+    collection = bpy.context.scene.collection
+
+    for entry in job["meshes"]:
+        key = entry["key"]
+        mesh = hpr.mesh_from_arrays("LOD_Source", arrays, key + "_", entry["layers"])
+        obj = bpy.data.objects.new("LOD_Source", mesh)
+        collection.objects.link(obj)
+
+        modifier = obj.modifiers.new("Decimate", 'DECIMATE')
+        modifier.decimate_type = 'COLLAPSE'
+
+        for level, ratio in enumerate(job["ratios"], 1):
+            modifier.ratio = ratio
+
+            #Evaluating the depsgraph again picks up the new ratio
+            evaluated = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+            lod_mesh = bpy.data.meshes.new_from_object(evaluated)
+            results.update(hpr.mesh_to_arrays(lod_mesh, key + "_" + str(level) + "_"))
+            bpy.data.meshes.remove(lod_mesh)
+
+        bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(mesh)
+
+    numpy.savez(job["output"], **results)
+
+    return 0
+
+def main():
+
+    arguments = script_arguments()
+
+    if not arguments:
+        print("A job file is required.")
+        return -1
+
+    with open(arguments[0], encoding = 'utf-8') as file:
+        job = json.load(file)
+
+    return decimate_meshes(job)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() == 0 else 1)